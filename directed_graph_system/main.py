@@ -3,23 +3,50 @@
 Directed Graph System Orchestrator with Resource & Deadline Tracking:
 - Reads dependency graph and optional settings from config.json under directed_graph_system/
 - Validates global deadline and system resources before launching nodes
+- Topologically sorts the graph once at startup (cycles abort before any node runs)
 - Executes node scripts from process_files/ asynchronously via subprocess.Popen
+- Redirects each node's stdout/stderr to logs/<node>.out / .err instead of pipes
+- Sleeps on a selector woken by SIGCHLD instead of fixed-interval polling
 - Monitors per-node timeouts, kills prolonged tasks
 - Tracks completion, updates dependencies, and spawns dependents when ready
-- Uses lock file (main.lock) with stale-lock detection
+- Optionally caps concurrent nodes at max_parallel (default: no cap), preferring shallow, wide-fan-out nodes
+- Holds an advisory lock on main.lock (flock / msvcrt) that the kernel drops on exit or crash
 - Logs to main.log, error.log, and benchmarks.log under directed_graph_system/
 """
 import os
 import sys
 import json
 import logging
+import logging.handlers
+import queue
 import atexit
+import functools
+import signal
+import selectors
 import subprocess
 import datetime
 import time
 import shutil
+import heapq
+import hashlib
+import pickle
+from array import array
 from pathlib import Path
-from collections import deque
+from dataclasses import dataclass, fields
+from typing import Optional, TypedDict
+
+# Optional fast JSON decoder with schema validation; falls back to the stdlib json module
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Advisory file locking: fcntl on POSIX, msvcrt on Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
 
 # External dependency for resource monitoring
 try:
@@ -29,143 +56,467 @@ except ImportError:
     logging.error("The 'psutil' module is required for resource monitoring. Please install it via 'pip install psutil'.")
     sys.exit(1)
 
-# Track if this process successfully acquired the lock
+# Track if this process successfully acquired the lock, and the descriptor holding it
 HAS_LOCK = False
+LOCK_FD  = None
+
+# Background threads writing root log records (console, main.log, error.log) and benchmarks.log
+LOG_LISTENER   = None
+BENCH_LISTENER = None
+
+# psutil.Process handles of running nodes, keyed by PID and reused across reads
+_PROC_HANDLES = {}
+
+# Set by the SIGALRM handler armed in arm_deadline(); checked once per main-loop pass
+DEADLINE_HIT = False
 
 # Directories
 BASE_DIR     = Path(__file__).parent
 PROJECT_ROOT = BASE_DIR.parent
 PROCESS_DIR  = PROJECT_ROOT / 'process_files'
 
+# Interpreter used for every node, resolved once
+_PYEXE = sys.executable
+
 # Path constants
 LOCK_FILE   = BASE_DIR / 'main.lock'
 CONFIG_FILE = BASE_DIR / 'config.json'
 MAIN_LOG    = BASE_DIR / 'main.log'
 ERROR_LOG   = BASE_DIR / 'error.log'
 BENCH_LOG   = BASE_DIR / 'benchmarks.log'
+NODE_LOG_DIR= BASE_DIR / 'logs'
+GRAPH_CACHE = BASE_DIR / '.topo_cache'
+GRAPH_CACHE_VERSION = 1  # bump whenever GraphCtx or its CSR layout changes meaning
 SEPARATOR   = '-' * 30
 
+# Event loop tuning
+MAX_WAIT    = 0.5    # upper bound on one selector wait; covers missed or unsupported SIGCHLD
+TAIL_BYTES  = 65536  # how much of a failed node's stderr file is copied into error.log
+KILL_GRACE  = 5      # seconds nodes get to exit after SIGTERM before they are SIGKILLed
+PROBE_MIN_INTERVAL = 0.1  # seconds; a psutil probe is never re-read sooner than this
+NO_TIMEOUT  = -1     # timeouts_ns entry of a node without a timeout
+RESOURCE_KEYS = ('cpu_percent', 'memory_percent', 'disk_free_mb', 'load_avg_1m')
+
 # ─── Logging ──────────────────────────────────────────────────────────────
+# Formatters are stateless and thread-safe: one shared instance per log format
+_FMT = logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
+
 def setup_logging():
+    """Route root logging through a queue so file and console writes happen off the main loop.
+
+    One QueueHandler on the root logger feeds a QueueListener that formats each
+    record once and dispatches it to main.log, the console and (ERROR only) error.log."""
+    global LOG_LISTENER
+    if LOG_LISTENER is not None:
+        return
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
-    fmt = logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
     # main.log
-    logger.addHandler(logging.FileHandler(MAIN_LOG, mode='a'))
+    fh = logging.FileHandler(MAIN_LOG, mode='a')
+    fh.setFormatter(_FMT)
     # console
     ch = logging.StreamHandler()
-    ch.setFormatter(fmt)
-    logger.addHandler(ch)
+    ch.setFormatter(_FMT)
     # error.log
     err = logging.FileHandler(ERROR_LOG, mode='a')
     err.setLevel(logging.ERROR)
-    err.setFormatter(fmt)
-    logger.addHandler(err)
+    err.setFormatter(_FMT)
+
+    q = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(q))
+    LOG_LISTENER = logging.handlers.QueueListener(q, fh, ch, err, respect_handler_level=True)
+    LOG_LISTENER.start()
+
+
+def _stop_listener(logger, listener):
+    """Detach logger's QueueHandler feeding listener, drain the queue and close its handlers."""
+    for h in list(logger.handlers):
+        if isinstance(h, logging.handlers.QueueHandler) and h.queue is listener.queue:
+            logger.removeHandler(h)
+    listener.stop()
+    for h in listener.handlers:
+        h.close()
+
+
+def stop_logging():
+    """Flush queued records and stop the listener threads of setup_logging() and setup_benchmark()."""
+    global LOG_LISTENER, BENCH_LISTENER
+    if BENCH_LISTENER is not None:
+        _stop_listener(logging.getLogger('benchmark'), BENCH_LISTENER)
+        BENCH_LISTENER = None
+    if LOG_LISTENER is not None:
+        _stop_listener(logging.getLogger(), LOG_LISTENER)
+        LOG_LISTENER = None
 
 # ─── Benchmark Logging ────────────────────────────────────────────────────
+class BenchmarkFormatter(logging.Formatter):
+    """'asctime: message' lines; SEPARATOR records are written bare, skipping time formatting."""
+
+    def format(self, record):
+        if record.msg == SEPARATOR and not record.args:
+            return SEPARATOR
+        return super().format(record)
+
+_BENCH_FMT = BenchmarkFormatter('%(asctime)s: %(message)s')
+
 def setup_benchmark():
+    """Return the 'benchmark' logger; its benchmarks.log writes happen on a listener thread."""
+    global BENCH_LISTENER
     bench = logging.getLogger('benchmark')
+    if BENCH_LISTENER is not None:
+        return bench
     bench.setLevel(logging.INFO)
     fh = logging.FileHandler(BENCH_LOG, mode='a')
-    fh.setFormatter(logging.Formatter('%(asctime)s: %(message)s'))
-    bench.addHandler(fh)
+    fh.setFormatter(_BENCH_FMT)
+    q = queue.Queue(-1)
+    bench.addHandler(logging.handlers.QueueHandler(q))
+    BENCH_LISTENER = logging.handlers.QueueListener(q, fh)
+    BENCH_LISTENER.start()
     return bench
 
 # ─── Locking ──────────────────────────────────────────────────────────────
 def acquire_lock():
-    global HAS_LOCK
-    if LOCK_FILE.exists():
-        pid_text = LOCK_FILE.read_text().strip()
-        try:
-            pid = int(pid_text)
-        except ValueError:
-            logging.warning(f"Invalid lock PID '{pid_text}'; removing stale lock.")
-            LOCK_FILE.unlink()
-        else:
-            try:
-                os.kill(pid, 0)
-            except OSError:
-                logging.warning(f"Stale lock for PID {pid}; removing.")
-                LOCK_FILE.unlink()
-            else:
-                logging.error(f"Lock held by active process {pid}. Exiting.")
-                sys.exit(1)
+    """Take an exclusive, non-blocking advisory lock on LOCK_FILE for the life of the process.
+
+    The lock belongs to the open descriptor, so the kernel releases it if the
+    process dies; there is no stale-lock cleanup. The PID is written into the
+    file purely as a debugging aid."""
+    global HAS_LOCK, LOCK_FD
     try:
-        LOCK_FILE.write_text(str(os.getpid()))
-        logging.info(f"Acquired lock (PID {os.getpid()}).")
-        HAS_LOCK = True
-    except Exception as e:
-        logging.error(f"Failed to create lock file: {e}")
+        fd = os.open(LOCK_FILE, os.O_CREAT | os.O_RDWR, 0o644)
+    except OSError as e:
+        logging.error("Failed to create lock file: %s", e)
+        sys.exit(1)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        os.close(fd)
+        try:
+            holder = LOCK_FILE.read_text().strip() or 'unknown'
+        except OSError:
+            holder = 'unknown'
+        logging.error("Lock held by active process %s. Exiting.", holder)
         sys.exit(1)
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    LOCK_FD  = fd
+    HAS_LOCK = True
+    logging.info("Acquired lock (PID %s).", os.getpid())
 
 
 def release_lock():
-    global HAS_LOCK
+    """Drop the lock by closing its descriptor; the file itself is left in place."""
+    global HAS_LOCK, LOCK_FD
     if not HAS_LOCK:
         return
     try:
-        if LOCK_FILE.exists():
-            LOCK_FILE.unlink()
-            logging.info("Released lock and removed lock file.")
-            HAS_LOCK = False
-    except Exception as e:
-        logging.error(f"Failed to remove lock file: {e}")
+        os.close(LOCK_FD)
+        logging.info("Released lock.")
+    except OSError as e:
+        logging.error("Failed to release lock: %s", e)
+    LOCK_FD  = None
+    HAS_LOCK = False
 
+# atexit runs handlers in reverse order: release_lock logs before the listener is stopped
+atexit.register(stop_logging)
 atexit.register(release_lock)
 
 # ─── Configuration Loading ────────────────────────────────────────────────
-def load_config():
-    """Load configuration JSON with optional deadlines and resource settings."""
+# Config schema ('in' is a keyword, hence the functional TypedDict form).
+# With msgspec installed it is validated while decoding; the result is plain dicts either way.
+NodeCfg = TypedDict('NodeCfg', {'in': list[str], 'timeout': Optional[float]}, total=False)
+Config  = TypedDict('Config', {
+    'deadline_seconds': Optional[float],
+    'max_parallel':     Optional[int],
+    'resources':        dict[str, Optional[float]],
+    'nodes':            dict[str, NodeCfg],
+}, total=False)
+
+@functools.lru_cache(maxsize=8)
+def _parse_config(path_str, mtime_ns, size):
+    """Decode a config file into (config, raw bytes); cached by (path, mtime, size) so an
+    unchanged file is read and parsed once."""
+    data = Path(path_str).read_bytes()
+    if msgspec is not None:
+        return msgspec.json.decode(data, type=Config), data
+    return json.loads(data), data
+
+def load_config(with_bytes=False):
+    """Load configuration JSON with optional deadlines and resource settings.
+
+    With with_bytes=True, returns (config, raw file bytes) so callers hashing the
+    file need not read it again. The returned dict is shared with the parse
+    cache; treat it as read-only."""
     try:
-        cfg = json.loads(CONFIG_FILE.read_text(encoding='utf-8'))
-        logging.info(f"Loaded configuration from {CONFIG_FILE}.")
-        return cfg
+        st  = CONFIG_FILE.stat()
+        cfg, data = _parse_config(str(CONFIG_FILE), st.st_mtime_ns, st.st_size)
+        logging.info("Loaded configuration from %s.", CONFIG_FILE)
+        return (cfg, data) if with_bytes else cfg
     except Exception as e:
-        logging.error(f"Error loading config.json: {e}")
+        logging.error("Error loading config.json: %s", e)
         sys.exit(1)
 
+load_config.cache_clear = _parse_config.cache_clear
+
 def load_graph():
     """Extract and return only the 'nodes' mapping from config."""
     return load_config().get('nodes', {})
 
+# ─── Graph Construction ──────────────────────────────────────────────────
+@dataclass(frozen=True, slots=True)
+class GraphCtx:
+    """Immutable, integer-indexed view of the node graph built once per run.
+
+    Every per-node field is aligned with `names`; the dependents of node i are
+    adj_indices[adj_indptr[i]:adj_indptr[i + 1]] (CSR layout) and argvs[i] is the
+    ready-made command line used to launch it. Integer fields are read-only
+    memoryviews over packed C-int arrays: 4 bytes per entry, and slicing a
+    node's dependents is a zero-copy view instead of a tuple copy.
+    timeouts_ns packs each timeout as 64-bit nanoseconds, NO_TIMEOUT if unset."""
+    names:       tuple
+    name_to_id:  dict
+    timeouts:    tuple
+    timeouts_ns: memoryview
+    in_degree:   memoryview
+    adj_indptr:  memoryview
+    adj_indices: memoryview
+    layers:      memoryview
+    crit_path:   tuple
+    argvs:       tuple
+
+def _frozen_ints(values, typecode='i'):
+    """Pack ints into a contiguous C array (C int by default) exposed as a read-only memoryview."""
+    return memoryview(array(typecode, values)).toreadonly()
+
+def build_graph(graph):
+    """Intern node names to integer ids and topologically sort the graph once.
+
+    Kahn's algorithm assigns each node a layer (longest prerequisite chain) and
+    exits on undefined prerequisites or cycles, before anything is launched. A
+    reverse pass over the topological order then gives each node its critical
+    path: its own cost (timeout, or 1 when unset) plus the costliest chain of
+    dependents it unblocks."""
+    names     = tuple(graph)
+    ids       = dict(zip(names, range(len(names))))
+    in_degree = [0] * len(names)
+    children  = [[] for _ in names]
+    timeouts  = []
+    argvs     = []
+    missing   = set()
+    # Single pass: in-degrees, reverse edges, timeouts and argvs together
+    for i, d in enumerate(graph.values()):
+        ins          = d.get('in', [])
+        in_degree[i] = len(ins)
+        timeouts.append(d.get('timeout'))
+        argvs.append([_PYEXE, str((PROCESS_DIR / names[i]).resolve())])
+        for pr in ins:
+            j = ids.get(pr)
+            if j is None:
+                missing.add(pr)
+            else:
+                children[j].append(i)
+    if missing:
+        logging.error("Config error: prereq(s) %s not defined.", ', '.join(sorted(missing)))
+        sys.exit(1)
+
+    adj_indptr  = [0]
+    adj_indices = []
+    for row in children:
+        adj_indices.extend(row)
+        adj_indptr.append(len(adj_indices))
+
+    # Kahn's algorithm on a scratch copy of the in-degrees
+    pending = list(in_degree)
+    layers  = [0] * len(names)
+    order   = [i for i, deg in enumerate(pending) if deg == 0]
+    head    = 0
+    while head < len(order):
+        i     = order[head]
+        head += 1
+        for c in adj_indices[adj_indptr[i]:adj_indptr[i + 1]]:
+            layers[c]   = max(layers[c], layers[i] + 1)
+            pending[c] -= 1
+            if pending[c] == 0:
+                order.append(c)
+    if len(order) != len(names):
+        # Whatever Kahn could not order sits on, or downstream of, a cycle
+        stuck = [names[i] for i, deg in enumerate(pending) if deg > 0]
+        logging.error("Cycle detected; nodes that can never run: %s. Aborting.", ', '.join(stuck))
+        sys.exit(1)
+
+    crit_path = [0.0] * len(names)
+    for i in reversed(order):
+        below        = max((crit_path[c] for c in adj_indices[adj_indptr[i]:adj_indptr[i + 1]]),
+                           default=0.0)
+        crit_path[i] = (timeouts[i] or 1) + below
+
+    return GraphCtx(
+        names       = names,
+        name_to_id  = ids,
+        timeouts    = tuple(timeouts),
+        timeouts_ns = _frozen_ints([NO_TIMEOUT if t is None else int(t * 1e9) for t in timeouts],
+                                   'q'),
+        in_degree   = _frozen_ints(in_degree),
+        adj_indptr  = _frozen_ints(adj_indptr),
+        adj_indices = _frozen_ints(adj_indices),
+        layers      = _frozen_ints(layers),
+        crit_path   = tuple(crit_path),
+        argvs       = tuple(argvs),
+    )
+
+def missing_scripts(names):
+    """Return the node names with no script file under PROCESS_DIR.
+
+    One os.scandir() listing answers all flat names at once instead of a stat()
+    per node; only names with a subdirectory component are checked one by one."""
+    try:
+        with os.scandir(PROCESS_DIR) as it:
+            present = {e.name for e in it if e.is_file()}
+    except FileNotFoundError:
+        present = set()
+    return [n for n in names
+            if not (n in present if os.sep not in n and '/' not in n
+                    else (PROCESS_DIR / n).is_file())]
+
+def load_graph_ctx(graph, cfg_bytes):
+    """Return the GraphCtx for graph, reusing the one persisted by an earlier run when possible.
+
+    Successful builds are pickled under GRAPH_CACHE, keyed by a blake2b hash of
+    the raw config bytes plus the script directory and interpreter baked into
+    argvs, GRAPH_CACHE_VERSION and the GraphCtx field names; any edit to
+    config.json or to the cached layout therefore misses and rebuilds.
+    Unreadable cache files are ignored and only the newest entry is kept."""
+    layout = f"{GRAPH_CACHE_VERSION}:{','.join(f.name for f in fields(GraphCtx))}"
+    key  = hashlib.blake2b(digest_size=16)
+    for part in (layout.encode(), cfg_bytes, str(PROCESS_DIR.resolve()).encode(), _PYEXE.encode()):
+        key.update(part)
+        key.update(b'\0')
+    path = GRAPH_CACHE / f'{key.hexdigest()}.pkl'
+    try:
+        state = pickle.loads(path.read_bytes())
+        return GraphCtx(**{k: memoryview(v).toreadonly() if isinstance(v, array) else v
+                           for k, v in state.items()})
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.warning("Ignoring unreadable graph cache %s: %s", path, e)
+
+    ctx   = build_graph(graph)
+    # memoryviews cannot be pickled; store the arrays underneath them
+    state = {f.name: getattr(ctx, f.name) for f in fields(GraphCtx)}
+    state = {k: v.obj if isinstance(v, memoryview) else v for k, v in state.items()}
+    try:
+        GRAPH_CACHE.mkdir(exist_ok=True)
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp.write_bytes(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp, path)
+        for old in GRAPH_CACHE.glob('*.pkl'):
+            if old != path:
+                old.unlink(missing_ok=True)
+    except OSError as e:
+        logging.warning("Could not write graph cache %s: %s", path, e)
+    return ctx
+
 # ─── Resource & Deadline Helpers ─────────────────────────────────────────
-def wait_for_resources(res_cfg, poll_interval=5, timeout=None):
-    """Blocks until system resources meet thresholds in res_cfg dict or raises TimeoutError."""
-    last_log    = 0.0
-    log_interval= max(poll_interval, 1)
-    start       = time.time()
+def _load_avg_1m():
+    """1-minute load average, or None where it is unavailable (Windows)."""
+    try:
+        return psutil.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
 
-    while True:
-        # Timeout enforcement for resource wait
-        if timeout is not None and (time.time() - start) > timeout:
-            raise TimeoutError(f"Resources not available within {timeout}s")
+class ResourceMonitor:
+    """Caches one psutil sample per poll_interval so every node in a launch wave shares it.
+
+    CPU is read with the non-blocking psutil.cpu_percent(interval=None), which
+    reports utilisation since the previous call (or since psutil was imported)."""
+
+    def __init__(self, poll_interval=5, min_interval=PROBE_MIN_INTERVAL):
+        self.poll_interval   = poll_interval
+        self.min_interval    = min_interval
+        self._last_sample_ts = None
+        self._cached         = {}
+        self._probes         = {}   # probe name -> (monotonic ts, reading)
+
+    def _probe(self, name, fn):
+        """Return fn()'s reading, reusing the last one if it is younger than min_interval."""
+        now  = time.monotonic()
+        last = self._probes.get(name)
+        if last is not None and now - last[0] < self.min_interval:
+            return last[1]
+        value = fn()
+        self._probes[name] = (now, value)
+        return value
+
+    def sample(self, res_cfg, refresh=False):
+        """Return {cpu, mem, disk_free, load1} readings, re-sampling only when stale or refresh is set.
 
-        ok = True
+        Even a forced refresh never calls the same psutil probe more than once per min_interval."""
+        now   = time.monotonic()
+        fresh = self._last_sample_ts is not None and now - self._last_sample_ts < self.poll_interval
+        if fresh and not refresh:
+            return self._cached
+        cached = {}
+        if res_cfg.get('cpu_percent') is not None:
+            cached['cpu'] = self._probe('cpu', lambda: psutil.cpu_percent(interval=None))
+        if res_cfg.get('memory_percent') is not None:
+            cached['mem'] = self._probe('mem', lambda: psutil.virtual_memory().percent)
+        if res_cfg.get('disk_free_mb') is not None:
+            cached['disk_free'] = self._probe(
+                'disk_free', lambda: shutil.disk_usage(PROCESS_DIR).free / (1024 * 1024))
+        if res_cfg.get('load_avg_1m') is not None:
+            cached['load1'] = self._probe('load1', _load_avg_1m)
+        self._cached         = cached
+        self._last_sample_ts = now
+        return cached
+
+    def available(self, res_cfg, refresh=False):
+        """True if the current (possibly cached) sample is within every configured threshold."""
+        sample = self.sample(res_cfg, refresh)
         # CPU utilization check
         cpu_pct = res_cfg.get('cpu_percent')
-        if cpu_pct is not None and psutil.cpu_percent(interval=0.5) > cpu_pct:
-            ok = False
+        if cpu_pct is not None and sample['cpu'] > cpu_pct:
+            return False
         # Memory utilization check
         mem_pct = res_cfg.get('memory_percent')
-        if ok and mem_pct is not None and psutil.virtual_memory().percent > mem_pct:
-            ok = False
+        if mem_pct is not None and sample['mem'] > mem_pct:
+            return False
         # Disk free space check (cross-platform)
         disk_free = res_cfg.get('disk_free_mb')
-        if ok and disk_free is not None:
-            free_mb = shutil.disk_usage(PROCESS_DIR).free / (1024 * 1024)
-            if free_mb < disk_free:
-                ok = False
+        if disk_free is not None and sample['disk_free'] < disk_free:
+            return False
         # Load average check (Unix-only)
         load1_cfg = res_cfg.get('load_avg_1m')
-        if ok and load1_cfg is not None:
-            try:
-                load1 = psutil.getloadavg()[0]
-            except (AttributeError, OSError):
-                load1 = None
-            if load1 is not None and load1 > load1_cfg:
-                ok = False
-        if ok:
+        load1     = sample.get('load1')
+        if load1_cfg is not None and load1 is not None and load1 > load1_cfg:
+            return False
+        return True
+
+def wait_for_resources(res_cfg, poll_interval=5, timeout=None, monitor=None):
+    """Blocks until system resources meet thresholds in res_cfg dict or raises TimeoutError.
+
+    Pass a shared ResourceMonitor to reuse its cached sample across calls. Returns
+    at once, without sampling anything, when no threshold is configured."""
+    if not res_cfg or all(res_cfg.get(k) is None for k in RESOURCE_KEYS):
+        return
+    if monitor is None:
+        monitor = ResourceMonitor(poll_interval)
+    last_log    = 0.0
+    log_interval= max(poll_interval, 1)
+    start       = time.time()
+    refresh     = False
+
+    while True:
+        # Timeout enforcement for resource wait
+        if timeout is not None and (time.time() - start) > timeout:
+            raise TimeoutError(f"Resources not available within {timeout}s")
+        # The first check may reuse the wave's cached sample; after sleeping, always re-sample
+        if monitor.available(res_cfg, refresh):
             return
+        refresh = True
         # Throttle log to once per interval
         now = time.time()
         if now - last_log >= log_interval:
@@ -173,35 +524,193 @@ def wait_for_resources(res_cfg, poll_interval=5, timeout=None):
             last_log = now
         time.sleep(poll_interval)
 
+class DeadlineExceeded(Exception):
+    """Raised by the main loop once the global deadline has passed."""
+
+def arm_deadline(seconds):
+    """Arm a one-shot ITIMER_REAL that sets DEADLINE_HIT after `seconds`.
+
+    The SIGALRM handler only sets the flag; the signal also lands on the wakeup
+    pipe, so the main loop wakes up, sees the flag and aborts from a known point
+    instead of mid-launch. Returns a disarm callable that cancels the timer and
+    restores the previous SIGALRM handler, or None where setitimer does not
+    exist (Windows), in which case the caller has to check the deadline itself."""
+    global DEADLINE_HIT
+    DEADLINE_HIT = False
+    if not hasattr(signal, 'setitimer'):
+        return None
+
+    def on_alarm(*_):
+        global DEADLINE_HIT
+        DEADLINE_HIT = True
+    prev_handler = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+
+    def disarm():
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, prev_handler)
+    return disarm
+
 # ─── Node Execution ────────────────────────────────────────────────────────
-def launch_node(node, bench):
-    """Start a node script and return process handle and start time."""
-    path = PROCESS_DIR / node
-    start= datetime.datetime.now()
-    bench.info(f"{node} started at {start}")
+def node_log_paths(node):
+    """Return the (stdout, stderr) capture files for a node under NODE_LOG_DIR."""
+    return NODE_LOG_DIR / f"{node}.out", NODE_LOG_DIR / f"{node}.err"
+
+def launch_node(node, bench, argv=None):
+    """Start a node script and return (process handle, monotonic start in ns).
+
+    The wall-clock start time is only written to the benchmark log; durations
+    and timeout expiries use the monotonic value so they are immune to clock
+    jumps. `argv` is the node's precomputed command line (GraphCtx.argvs); it
+    is built on the fly if omitted.
+
+    stdout/stderr go straight to the node's files in NODE_LOG_DIR, so the parent
+    never drains pipes. With no pipes, cwd or preexec_fn and close_fds=False,
+    CPython spawns the child via posix_spawn() instead of fork()+exec(); file
+    descriptors are non-inheritable by default, so nothing extra leaks into the child."""
+    if argv is None:
+        argv = [_PYEXE, str(PROCESS_DIR / node)]
+    start_ns= time.monotonic_ns()
+    bench.info("%s started at %s", node, datetime.datetime.now())
+    out_path, err_path = node_log_paths(node)
     try:
-        proc = subprocess.Popen(
-            [sys.executable, str(path)],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        return proc, start
+        # Nested node names (sub/a.py) get matching subdirectories under NODE_LOG_DIR
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(out_path, 'wb') as out, open(err_path, 'wb') as err:
+            proc = subprocess.Popen(
+                argv,
+                stdout=out,
+                stderr=err,
+                close_fds=False
+            )
+        return proc, start_ns
     except Exception as e:
-        logging.error(f"Failed to start {node}: {e}")
+        logging.error("Failed to start %s: %s", node, e)
         return None, None
 
+def read_tail(path, limit=TAIL_BYTES):
+    """Return up to the last `limit` bytes of a node log file as text ('' if missing)."""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(max(size - limit, 0))
+            return f.read().decode(errors='replace')
+    except FileNotFoundError:
+        return ''
+
+def kill_all(running, grace=KILL_GRACE):
+    """SIGTERM every running node, then SIGKILL whatever is still alive after `grace` seconds."""
+    procs = [entry[0] for entry in running.values()]
+    for proc in procs:
+        try:
+            proc.terminate()
+        except OSError:
+            pass
+    end = time.monotonic() + grace
+    for proc in procs:
+        try:
+            proc.wait(max(end - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+def node_stats(pid):
+    """Return {status, cpu_s, rss_mb} for a running node, or None if it cannot be read.
+
+    The psutil.Process handle is cached per PID, and all fields are read inside
+    one oneshot() block so /proc/<pid> is parsed once rather than per field."""
+    if pid is None:
+        return None
+    try:
+        handle = _PROC_HANDLES.get(pid)
+        if handle is None:
+            handle = _PROC_HANDLES[pid] = psutil.Process(pid)
+        with handle.oneshot():
+            cpu = handle.cpu_times()
+            return {
+                'status': handle.status(),
+                'cpu_s':  round(cpu.user + cpu.system, 2),
+                'rss_mb': round(handle.memory_info().rss / (1024 * 1024), 1),
+            }
+    except (psutil.Error, TypeError, ValueError):
+        return None
+
+# ─── Event Wakeup ──────────────────────────────────────────────────────────
+def install_wakeup(sel):
+    """Register a self-pipe on sel that becomes readable whenever SIGCHLD arrives.
+
+    Returns a restore callable undoing the signal setup; a no-op where SIGCHLD
+    does not exist (Windows), in which case waits fall back to MAX_WAIT."""
+    if not hasattr(signal, 'SIGCHLD'):
+        return lambda: None
+    r, w = os.pipe()
+    os.set_blocking(r, False)
+    os.set_blocking(w, False)
+    sel.register(r, selectors.EVENT_READ)
+    prev_fd      = signal.set_wakeup_fd(w)
+    prev_handler = signal.signal(signal.SIGCHLD, lambda *_: None)
+
+    def restore():
+        signal.signal(signal.SIGCHLD, prev_handler)
+        signal.set_wakeup_fd(prev_fd)
+        sel.unregister(r)
+        os.close(r)
+        os.close(w)
+    return restore
+
+def wait_for_events(sel, timeout):
+    """Block until a child exits (SIGCHLD) or timeout elapses, then drain the wakeup pipe."""
+    if not sel.get_map():
+        time.sleep(timeout)
+        return
+    for key, _ in sel.select(timeout):
+        try:
+            while os.read(key.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+def exited_nodes(running, pid_to_id):
+    """Yield ids of running nodes whose process has exited, one waitid() call per exit.
+
+    waitid(P_ALL, WNOHANG|WNOWAIT) reports an exited child without reaping it,
+    so the caller must reap each yielded node via proc.poll() before resuming the
+    generator. Falls back to yielding every running node where waitid is missing
+    (Windows), when there are no OS children behind `running` (ECHILD), or when
+    the exited child is not one of ours."""
+    if not hasattr(os, 'waitid'):
+        yield from list(running)
+        return
+    while running:
+        try:
+            info = os.waitid(os.P_ALL, 0, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+        except ChildProcessError:
+            info = False
+        if info is None:
+            return
+        i = pid_to_id.get(info.si_pid) if info else None
+        if i is None or i not in running:
+            yield from list(running)
+            return
+        yield i
+
 # ─── Orchestration ────────────────────────────────────────────────────────
 def main():
     setup_logging()
     bench     = setup_benchmark()
     acquire_lock()
+    # Turn SIGTERM into a normal exit so atexit (lock release, log flush) still runs
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(1))
 
-    cfg       = load_config()
+    cfg, cfg_bytes = load_config(with_bytes=True)
     deadline  = cfg.get('deadline_seconds')
     res_cfg   = cfg.get('resources', {})
     graph     = cfg.get('nodes', {})
+    max_par   = cfg.get('max_parallel')
 
+    if max_par is not None and (not isinstance(max_par, int) or max_par < 1):
+        logging.error("Config error: max_parallel must be a positive integer, got %r.", max_par)
+        sys.exit(1)
     if deadline is not None and deadline <= 0:
         logging.error(
             "Global deadline of %s seconds expired before start; aborting run.",
@@ -209,82 +718,139 @@ def main():
         )
         sys.exit(1)
 
-    # Build in-degree and adjacency
-    in_degree = {n: len(d.get('in', [])) for n, d in graph.items()}
-    adj       = {n: [] for n in graph}
-    timeouts  = {n: d.get('timeout') for n, d in graph.items()}
-    for n, d in graph.items():
-        for pr in d.get('in', []):
-            if pr not in adj:
-                logging.error(f"Config error: prereq '{pr}' not defined.")
-                sys.exit(1)
-            adj[pr].append(n)
-
-    start_time= time.time()
-    queue     = deque([n for n, deg in in_degree.items() if deg == 0])
-    running   = {}
-    completed = set()
+    ctx       = load_graph_ctx(graph, cfg_bytes)
+    names     = ctx.names
+    timeouts  = ctx.timeouts
+    timeouts_ns = ctx.timeouts_ns
+    adj_indptr, adj_indices = ctx.adj_indptr, ctx.adj_indices
+    in_degree = array('i', ctx.in_degree)   # mutable countdown for this run
+    absent    = missing_scripts(names)
+    if absent:
+        logging.error("Config error: node script(s) %s not found in %s.", ', '.join(absent), PROCESS_DIR)
+        sys.exit(1)
+    if names:
+        logging.info("Graph has %s nodes in %s layers.", len(names), max(ctx.layers) + 1)
+    if max_par is None:
+        max_par = len(names)   # no cap: every ready node starts at once
+
+    start_ns  = time.monotonic_ns()
+    deadline_ns = None if deadline is None else int(deadline * 1e9)
+    # Ready nodes as a heap of (-critical_path, -out_degree, id): the node heading
+    # the longest remaining chain first, then the one unblocking the most dependents
+    priority  = [(-ctx.crit_path[i], adj_indptr[i] - adj_indptr[i + 1], i) for i in range(len(names))]
+    ready     = [priority[i] for i, deg in enumerate(in_degree) if deg == 0]
+    heapq.heapify(ready)
+    running   = {}   # id -> (proc, monotonic start ns)
+    pid_to_id = {}
+    expiries  = []   # heap of (expiry_ns, id) for running nodes that have a timeout
+    monitor   = ResourceMonitor(poll_interval=5)
+    needs_check    = any(res_cfg.get(k) is not None for k in RESOURCE_KEYS)
+    last_res_check = None   # monotonic time of the last passed per-wave resource check
+    sel       = selectors.DefaultSelector()
+    restore   = install_wakeup(sel)
 
     logging.info("Starting directed graph execution")
     bench.info(SEPARATOR)
 
-    while queue or running:
-        # Global deadline enforcement
-        if deadline is not None and (time.time() - start_time) > deadline:
-            logging.error("Global deadline exceeded; aborting run.")
-            sys.exit(1)
+    # The global deadline is a one-shot kernel timer; only without setitimer is it polled
+    disarm    = arm_deadline(deadline) if deadline is not None else None
+    poll_deadline_ns = deadline_ns if disarm is None else None
+    try:
+        while ready or running:
+            # Global deadline enforcement: flag set by SIGALRM, or polled without setitimer
+            if DEADLINE_HIT or (poll_deadline_ns is not None
+                                and time.monotonic_ns() - start_ns > poll_deadline_ns):
+                raise DeadlineExceeded()
 
-        # Launch ready nodes with resource check
-        while queue:
-            node      = queue.popleft()
-            if res_cfg:
+            # Check resources once per launch wave; a wave started within the last
+            # poll_interval reuses the previous verdict instead of re-sampling
+            wave = ready and len(running) < max_par
+            if wave and needs_check and (
+                    last_res_check is None
+                    or time.monotonic() - last_res_check > monitor.poll_interval):
                 # calculate remaining time for resource wait
                 remaining = None
                 if deadline is not None:
-                    elapsed   = time.time() - start_time
+                    elapsed   = (time.monotonic_ns() - start_ns) / 1e9
                     remaining = max(deadline - elapsed, 0)
                 try:
-                    wait_for_resources(res_cfg, poll_interval=5, timeout=remaining)
+                    wait_for_resources(res_cfg, poll_interval=monitor.poll_interval,
+                                       timeout=remaining, monitor=monitor)
                 except TimeoutError as e:
-                    logging.error(f"Resource wait timeout: {e}")
+                    # The wait is capped by the global deadline, so nodes already running must go too
+                    logging.error("Resource wait timeout: %s", e)
+                    kill_all(running)
                     sys.exit(1)
-            proc, start= launch_node(node, bench)
-            if not proc:
-                logging.error(f"Error launching node {node}")
-                sys.exit(1)
-            running[node] = (proc, start)
-
-        # Poll running processes
-        time.sleep(0.5)
-        now = time.time()
-        for node, (proc, start_dt) in list(running.items()):
-            timeout = timeouts.get(node)
-            elapsed = now - start_dt.timestamp()
-            if timeout is not None and elapsed > timeout:
-                proc.kill()
-                logging.error(f"Node {node} timed out after {timeout} seconds.")
-                sys.exit(1)
-            ret = proc.poll()
-            if ret is not None:
-                stdout, stderr = proc.communicate()
-                end = datetime.datetime.now()
-                bench.info(f"{node} ended at {end}, duration {end - start_dt}")
+                last_res_check = time.monotonic()
+
+            # Launch the whole wave of ready nodes, up to max_parallel at once
+            while ready and len(running) < max_par:
+                i         = heapq.heappop(ready)[2]
+                proc, started_ns = launch_node(names[i], bench, ctx.argvs[i])
+                if not proc:
+                    logging.error("Error launching node %s", names[i])
+                    sys.exit(1)
+                running[i] = (proc, started_ns)
+                pid_to_id[proc.pid] = i
+                if timeouts_ns[i] != NO_TIMEOUT:
+                    heapq.heappush(expiries, (started_ns + timeouts_ns[i], i))
+
+            # Sleep until a child exits (SIGCHLD) or the nearest timeout; expiries of
+            # nodes that already finished are discarded lazily from the heap top
+            while expiries and expiries[0][1] not in running:
+                heapq.heappop(expiries)
+            now_ns  = time.monotonic_ns()
+            wait_ns = int(MAX_WAIT * 1e9)
+            if poll_deadline_ns is not None:
+                wait_ns = min(wait_ns, poll_deadline_ns - (now_ns - start_ns))
+            if expiries:
+                wait_ns = min(wait_ns, expiries[0][0] - now_ns)
+            wait_for_events(sel, max(wait_ns, 0) / 1e9)
+
+            # Enforce per-node timeouts: only the heap top can have expired
+            now_ns = time.monotonic_ns()
+            while expiries and expiries[0][0] < now_ns:
+                _, i = heapq.heappop(expiries)
+                if i in running:
+                    proc  = running[i][0]
+                    stats = node_stats(proc.pid)
+                    proc.kill()
+                    logging.error("Node %s timed out after %s seconds.%s", names[i], timeouts[i],
+                                  f" Last seen: {stats}" if stats else "")
+                    sys.exit(1)
+
+            # Reap only the children that actually exited
+            for i in exited_nodes(running, pid_to_id):
+                proc, started_ns = running[i]
+                ret = proc.poll()
+                if ret is None:
+                    continue
+                node = names[i]
+                end  = datetime.datetime.now()
+                bench.info("%s ended at %s, duration %s", node, end,
+                           datetime.timedelta(microseconds=(time.monotonic_ns() - started_ns) // 1000))
+                out_path, err_path = node_log_paths(node)
                 if ret == 0:
-                    logging.info(f"{node} output:\n{stdout}")
-                    completed.add(node)
-                    for child in adj[node]:
+                    logging.info("%s ok (log=%s)", node, out_path)
+                    for child in adj_indices[adj_indptr[i]:adj_indptr[i + 1]]:
                         in_degree[child] -= 1
                         if in_degree[child] == 0:
-                            queue.append(child)
+                            heapq.heappush(ready, priority[child])
                 else:
-                    logging.error(f"{node} failed (code {ret}):\n{stderr}")
+                    logging.error("%s failed (code %s):\n%s", node, ret, read_tail(err_path))
                     sys.exit(1)
-                del running[node]
-
-    # Final check for cycles
-    if len(completed) != len(graph):
-        logging.error("Cycle detected or missing dependency; aborting.")
+                del running[i]
+                pid_to_id.pop(proc.pid, None)
+                _PROC_HANDLES.pop(proc.pid, None)
+    except DeadlineExceeded:
+        logging.error("Global deadline exceeded; aborting run.")
+        kill_all(running)
         sys.exit(1)
+    finally:
+        if disarm is not None:
+            disarm()
+        restore()
+        sel.close()
 
     logging.info("All nodes completed successfully.")
     bench.info(SEPARATOR)
@@ -4,8 +4,10 @@ import sys
 import json
 import tempfile
 import shutil
-import datetime
 import time
+import logging
+import logging.handlers
+import subprocess
 from unittest.mock import patch, MagicMock
 from pathlib import Path
 
@@ -17,28 +19,72 @@ Run it like: python3 -m unittest discover -v
 """
 
 class TestDirectedGraphSystem(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # One scratch tree for the whole class, on tmpfs where available
+        cls._tmp = tempfile.TemporaryDirectory(dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+        cls.tmpdir = Path(cls._tmp.name)
+        cls.process_dir = cls.tmpdir / 'project' / 'process_files'
+        cls.process_dir.mkdir(parents=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
     def setUp(self):
-        # Setup temporary BASE_DIR
-        self.tmpdir = Path(tempfile.mkdtemp())
-        dg_main.BASE_DIR = self.tmpdir
-        dg_main.PROJECT_ROOT = self.tmpdir / 'project'
-        dg_main.PROJECT_ROOT.mkdir()
-        self.process_dir = dg_main.PROJECT_ROOT / 'process_files'
-        self.process_dir.mkdir()
-        dg_main.PROCESS_DIR = self.process_dir
-        # Patch file paths
-        dg_main.LOCK_FILE = self.tmpdir / 'main.lock'
-        dg_main.MAIN_LOG = self.tmpdir / 'main.log'
-        dg_main.ERROR_LOG = self.tmpdir / 'error.log'
-        dg_main.BENCH_LOG = self.tmpdir / 'benchmarks.log'
-        dg_main.CONFIG_FILE = self.tmpdir / 'config.json'
-        # Ensure clean state
-        if dg_main.LOCK_FILE.exists():
-            dg_main.LOCK_FILE.unlink()
+        # Point the module's paths at the shared scratch tree for this test only
+        paths = {
+            'BASE_DIR': self.tmpdir,
+            'PROJECT_ROOT': self.tmpdir / 'project',
+            'PROCESS_DIR': self.process_dir,
+            'LOCK_FILE': self.tmpdir / 'main.lock',
+            'MAIN_LOG': self.tmpdir / 'main.log',
+            'ERROR_LOG': self.tmpdir / 'error.log',
+            'BENCH_LOG': self.tmpdir / 'benchmarks.log',
+            'NODE_LOG_DIR': self.tmpdir / 'logs',
+            'CONFIG_FILE': self.tmpdir / 'config.json',
+            'GRAPH_CACHE': self.tmpdir / '.topo_cache',
+        }
+        for name, value in paths.items():
+            patcher = patch.object(dg_main, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Per-test isolation without rebuilding the tree: truncate logs, drop leftovers
+        for log in (dg_main.MAIN_LOG, dg_main.ERROR_LOG, dg_main.BENCH_LOG):
+            open(log, 'w').close()
+        for script in self.process_dir.iterdir():
+            script.unlink()
+        dg_main.CONFIG_FILE.unlink(missing_ok=True)
+        dg_main.load_config.cache_clear()
         dg_main.HAS_LOCK = False
 
     def tearDown(self):
-        shutil.rmtree(self.tmpdir)
+        dg_main.release_lock()
+        dg_main.stop_logging()
+
+    def test_setup_logging_writes_once_per_file(self):
+        dg_main.setup_logging()
+        dg_main.setup_logging()  # idempotent: no duplicate handlers
+        logging.getLogger().error("boom")
+        logging.getLogger().info("fine")
+        dg_main.stop_logging()
+        main_log = dg_main.MAIN_LOG.read_text()
+        self.assertEqual(main_log.count("ERROR: boom"), 1)
+        self.assertIn("INFO: fine", main_log)
+        error_log = dg_main.ERROR_LOG.read_text()
+        self.assertIn("ERROR: boom", error_log)
+        self.assertNotIn("fine", error_log)
+
+    def test_benchmark_log_written_by_listener(self):
+        bench = dg_main.setup_benchmark()
+        self.assertIs(dg_main.setup_benchmark(), bench)  # idempotent
+        bench.info("a.py ended")
+        bench.info(dg_main.SEPARATOR)
+        dg_main.stop_logging()
+        lines = dg_main.BENCH_LOG.read_text().splitlines()
+        self.assertTrue(lines[0].endswith(": a.py ended"))
+        self.assertEqual(lines[1], dg_main.SEPARATOR)
+        self.assertFalse(any(isinstance(h, logging.handlers.QueueHandler) for h in bench.handlers))
 
     def test_load_graph_success(self):
         data = {"nodes": {"a.py": {"in": []}}}
@@ -52,43 +98,68 @@ class TestDirectedGraphSystem(unittest.TestCase):
         loaded = dg_main.load_graph()
         self.assertEqual(loaded, {})
 
+    def test_load_config_parses_unchanged_file_once(self):
+        dg_main.CONFIG_FILE.write_text(json.dumps({'nodes': {'a.py': {'in': []}}}))
+        first = dg_main.load_config()
+        self.assertIs(dg_main.load_config(), first)
+        # Rewriting the file changes its size/mtime and invalidates the cache
+        dg_main.CONFIG_FILE.write_text(json.dumps({'nodes': {'b.py': {'in': []}, 'c.py': {'in': []}}}))
+        self.assertEqual(list(dg_main.load_graph()), ['b.py', 'c.py'])
+
     def test_load_graph_failure(self):
         dg_main.CONFIG_FILE.write_text("not-a-json")
         with self.assertRaises(SystemExit):
             dg_main.load_config()
 
+    @unittest.skipIf(dg_main.msgspec is None, "msgspec not installed")
+    def test_load_config_rejects_bad_schema(self):
+        dg_main.CONFIG_FILE.write_text(json.dumps({'nodes': {'a.py': {'in': 'b.py'}}}))
+        with self.assertRaises(SystemExit):
+            dg_main.load_config()
+
     def test_acquire_and_release_lock(self):
         dg_main.acquire_lock()
         self.assertTrue(dg_main.HAS_LOCK)
         self.assertTrue(dg_main.LOCK_FILE.exists())
         self.assertEqual(dg_main.LOCK_FILE.read_text(), str(os.getpid()))
         dg_main.release_lock()
-        self.assertFalse(dg_main.LOCK_FILE.exists())
         self.assertFalse(dg_main.HAS_LOCK)
+        self.assertIsNone(dg_main.LOCK_FD)
+        # Released lock can be taken again
+        dg_main.acquire_lock()
+        self.assertTrue(dg_main.HAS_LOCK)
+        dg_main.release_lock()
 
     def test_acquire_lock_stale_and_active(self):
-        # Stale PID in lock file
+        # Leftover file from a dead process is not locked, so it is simply reused
         dg_main.LOCK_FILE.write_text("badpid")
         dg_main.acquire_lock()
         self.assertTrue(dg_main.HAS_LOCK)
+        self.assertEqual(dg_main.LOCK_FILE.read_text(), str(os.getpid()))
         dg_main.release_lock()
-        # Active PID blocks acquisition
-        dg_main.LOCK_FILE.write_text(str(os.getpid()))
-        with self.assertRaises(SystemExit):
-            dg_main.acquire_lock()
+        # A live holder of the lock blocks acquisition
+        with open(dg_main.LOCK_FILE, 'r+') as holder:
+            if dg_main.fcntl is not None:
+                dg_main.fcntl.flock(holder.fileno(), dg_main.fcntl.LOCK_EX | dg_main.fcntl.LOCK_NB)
+            else:
+                dg_main.msvcrt.locking(holder.fileno(), dg_main.msvcrt.LK_NBLCK, 1)
+            with self.assertRaises(SystemExit):
+                dg_main.acquire_lock()
+            self.assertFalse(dg_main.HAS_LOCK)
 
     @patch('subprocess.Popen')
     def test_launch_node(self, mock_popen):
         dummy_proc = MagicMock()
         mock_popen.return_value = dummy_proc
-        proc, start = dg_main.launch_node('foo.py', MagicMock())
+        proc, start_ns = dg_main.launch_node('foo.py', MagicMock())
         self.assertIs(proc, dummy_proc)
-        self.assertIsInstance(start, datetime.datetime)
+        self.assertEqual(mock_popen.call_args[0][0], [sys.executable, str(self.process_dir / 'foo.py')])
+        self.assertIsInstance(start_ns, int)
         # Simulate exception when spawning
         mock_popen.side_effect = Exception('oops')
-        proc2, start2 = dg_main.launch_node('bar.py', MagicMock())
+        proc2, start_ns2 = dg_main.launch_node('bar.py', MagicMock())
         self.assertIsNone(proc2)
-        self.assertIsNone(start2)
+        self.assertIsNone(start_ns2)
 
     @patch.object(dg_main.psutil, 'cpu_percent', side_effect=[100, 40])
     @patch('time.sleep', return_value=None)
@@ -122,6 +193,30 @@ class TestDirectedGraphSystem(unittest.TestCase):
             )
             self.assertLess(time.time() - start, 0.1)
 
+    def test_wait_for_resources_without_thresholds_samples_nothing(self):
+        with patch.object(dg_main.ResourceMonitor, 'sample') as mock_sample:
+            dg_main.wait_for_resources({})
+            dg_main.wait_for_resources(None)
+            dg_main.wait_for_resources({'cpu_percent': None, 'load_avg_1m': None})
+        mock_sample.assert_not_called()
+
+    @patch.object(dg_main.psutil, 'cpu_percent', return_value=10)
+    def test_resource_monitor_shares_sample_within_interval(self, mock_cpu):
+        monitor = dg_main.ResourceMonitor(poll_interval=60)
+        for _ in range(3):
+            dg_main.wait_for_resources({'cpu_percent': 50}, poll_interval=60, monitor=monitor)
+        mock_cpu.assert_called_once_with(interval=None)
+
+    @patch.object(dg_main.psutil, 'cpu_percent', return_value=10)
+    def test_resource_monitor_probe_min_interval(self, mock_cpu):
+        monitor = dg_main.ResourceMonitor(poll_interval=0, min_interval=60)
+        for _ in range(3):
+            self.assertTrue(monitor.available({'cpu_percent': 50}, refresh=True))
+        mock_cpu.assert_called_once_with(interval=None)
+        monitor.min_interval = 0
+        monitor.available({'cpu_percent': 50}, refresh=True)
+        self.assertEqual(mock_cpu.call_count, 2)
+
     @patch.object(dg_main.psutil, 'cpu_percent', return_value=100)
     def test_wait_for_resources_timeout(self, mock_cpu):
         with self.assertRaises(TimeoutError):
@@ -139,7 +234,7 @@ class TestDirectedGraphSystem(unittest.TestCase):
         fake = MagicMock()
         fake.poll.side_effect = [0]
         fake.communicate.return_value = ('', '')
-        with patch.object(dg_main, 'launch_node', return_value=(fake, datetime.datetime.now())):
+        with patch.object(dg_main, 'launch_node', return_value=(fake, time.monotonic_ns())):
             dg_main.main()
 
     @patch('subprocess.Popen')
@@ -160,7 +255,7 @@ class TestDirectedGraphSystem(unittest.TestCase):
         P = MagicMock()
         P.poll.return_value = None
         P.kill.return_value = None
-        with patch.object(dg_main, 'launch_node', return_value=(P, datetime.datetime.now())):
+        with patch.object(dg_main, 'launch_node', return_value=(P, time.monotonic_ns())):
             with self.assertRaises(SystemExit):
                 dg_main.main()
 
@@ -168,9 +263,10 @@ class TestDirectedGraphSystem(unittest.TestCase):
         graph = {'deadline_seconds': 10, 'nodes': {'a.py': {'in': [], 'timeout': 1}}}
         dg_main.CONFIG_FILE.write_text(json.dumps(graph))
         (self.process_dir / 'a.py').write_text('')
-        fake_start = datetime.datetime.now() - datetime.timedelta(seconds=2)
         P = MagicMock(poll=MagicMock(return_value=None), kill=MagicMock())
-        with patch.object(dg_main, 'launch_node', return_value=(P, fake_start)):
+        # Started "2 s ago" on the monotonic clock
+        fake_start_ns = time.monotonic_ns() - 2_000_000_000
+        with patch.object(dg_main, 'launch_node', return_value=(P, fake_start_ns)):
             with self.assertRaises(SystemExit):
                 dg_main.main()
 
@@ -180,6 +276,7 @@ class TestDirectedGraphSystem(unittest.TestCase):
         (self.process_dir / 'a.py').write_text('')
 
         class P:
+            pid = None
             def __init__(self): self.done = False
             def poll(self):
                 if not self.done:
@@ -188,7 +285,7 @@ class TestDirectedGraphSystem(unittest.TestCase):
                 return 0
             def communicate(self): return ('ok', '')
 
-        with patch.object(dg_main, 'launch_node', return_value=(P(), datetime.datetime.now())):
+        with patch.object(dg_main, 'launch_node', return_value=(P(), time.monotonic_ns())):
             dg_main.main()
 
     def test_missing_dependency(self):
@@ -197,6 +294,18 @@ class TestDirectedGraphSystem(unittest.TestCase):
         with self.assertRaises(SystemExit):
             dg_main.main()
 
+    def test_missing_scripts_abort_before_launch(self):
+        graph = {'nodes': {'a.py': {'in': []}, 'b.py': {'in': ['a.py']}}}
+        dg_main.CONFIG_FILE.write_text(json.dumps(graph))
+        (self.process_dir / 'a.py').write_text('')
+        self.assertEqual(dg_main.missing_scripts(['a.py', 'b.py']), ['b.py'])
+        with patch.object(dg_main, 'launch_node') as mock_launch, \
+             self.assertLogs(level='ERROR') as logs:
+            with self.assertRaises(SystemExit):
+                dg_main.main()
+        mock_launch.assert_not_called()
+        self.assertIn("node script(s) b.py not found", logs.output[-1])
+
     def test_cycle_detection(self):
         graph = {'nodes': {
             'a.py': {'in': ['b.py'], 'timeout': None},
@@ -208,6 +317,81 @@ class TestDirectedGraphSystem(unittest.TestCase):
         with self.assertRaises(SystemExit):
             dg_main.main()
 
+    def test_build_graph_layers_and_csr(self):
+        graph = {
+            'a.py': {'in': []},
+            'b.py': {'in': ['a.py']},
+            'c.py': {'in': ['a.py']},
+            'd.py': {'in': ['b.py', 'c.py']}
+        }
+        ctx = dg_main.build_graph(graph)
+        indptr, indices = ctx.adj_indptr, ctx.adj_indices
+        self.assertEqual(ctx.names, ('a.py', 'b.py', 'c.py', 'd.py'))
+        self.assertEqual(ctx.name_to_id['c.py'], 2)
+        self.assertEqual(ctx.in_degree.tolist(), [0, 1, 1, 2])
+        self.assertEqual(indices[indptr[0]:indptr[1]].tolist(), [1, 2])
+        self.assertEqual(indices[indptr[3]:indptr[4]].tolist(), [])
+        self.assertEqual(ctx.layers.tolist(), [0, 1, 1, 2])
+        self.assertTrue(ctx.adj_indices.readonly)
+        self.assertEqual(ctx.timeouts, (None, None, None, None))
+        self.assertEqual(ctx.crit_path, (3, 2, 2, 1))
+        self.assertEqual(ctx.timeouts_ns.tolist(), [dg_main.NO_TIMEOUT] * 4)
+        self.assertEqual(ctx.argvs[3], [sys.executable, str((self.process_dir / 'd.py').resolve())])
+
+    def test_graph_ctx_persisted_across_runs(self):
+        graph = {'a.py': {'in': []}, 'b.py': {'in': ['a.py']}}
+        cfg_bytes = json.dumps({'nodes': graph}).encode()
+        built = dg_main.load_graph_ctx(graph, cfg_bytes)
+        with patch.object(dg_main, 'build_graph') as mock_build:
+            cached = dg_main.load_graph_ctx(graph, cfg_bytes)
+        mock_build.assert_not_called()
+        self.assertEqual(cached.names, built.names)
+        self.assertEqual(cached.adj_indices.tolist(), built.adj_indices.tolist())
+        self.assertTrue(cached.in_degree.readonly)
+        # Different config bytes miss the cache and replace the old entry
+        dg_main.load_graph_ctx(graph, cfg_bytes + b' ')
+        self.assertEqual(len(list(dg_main.GRAPH_CACHE.glob('*.pkl'))), 1)
+        # A new cache format version never trusts pickles written by the old one
+        with patch.object(dg_main, 'GRAPH_CACHE_VERSION', dg_main.GRAPH_CACHE_VERSION + 1), \
+             patch.object(dg_main, 'build_graph', wraps=dg_main.build_graph) as spy:
+            dg_main.load_graph_ctx(graph, cfg_bytes + b' ')
+        spy.assert_called_once()
+
+    def test_cycle_detected_before_launch(self):
+        graph = {'nodes': {
+            'root.py': {'in': [], 'timeout': None},
+            'a.py': {'in': ['root.py', 'b.py'], 'timeout': None},
+            'b.py': {'in': ['a.py'], 'timeout': None}
+        }}
+        dg_main.CONFIG_FILE.write_text(json.dumps(graph))
+        with patch.object(dg_main, 'launch_node') as mock_launch, \
+             self.assertLogs(level='ERROR') as logs:
+            with self.assertRaises(SystemExit):
+                dg_main.main()
+        mock_launch.assert_not_called()
+        self.assertIn('nodes that can never run: a.py, b.py', logs.output[0])
+        self.assertNotIn('root.py', logs.output[0])
+
+    @unittest.skipUnless(hasattr(os, 'waitid'), "os.waitid not available on this platform")
+    def test_exited_nodes_reports_only_finished_children(self):
+        fast = subprocess.Popen([sys.executable, '-c', 'pass'])
+        slow = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(5)'])
+        try:
+            running = {0: (fast, None), 1: (slow, None)}
+            pid_to_id = {fast.pid: 0, slow.pid: 1}
+            os.waitid(os.P_PID, fast.pid, os.WEXITED | os.WNOWAIT)  # block until fast is a zombie
+            seen = []
+            for i in dg_main.exited_nodes(running, pid_to_id):
+                seen.append(i)
+                running[i][0].poll()
+                del running[i]
+            self.assertEqual(seen, [0])
+            self.assertEqual(fast.returncode, 0)
+            self.assertIsNone(slow.poll())
+        finally:
+            slow.kill()
+            slow.wait()
+
     def test_multi_node_dag_ordering(self):
         graph = {'nodes': {
             'a.py': {'in': [], 'timeout': None},
@@ -220,17 +404,117 @@ class TestDirectedGraphSystem(unittest.TestCase):
             (self.process_dir / f).write_text('')
         calls = []
 
-        def fake_launch(node, bench):
+        def fake_launch(node, bench, argv=None):
             calls.append(node)
             P = MagicMock()
             P.poll.side_effect = [None, 0]
             P.communicate.return_value = ('', '')
-            return (P, datetime.datetime.now())
+            return (P, time.monotonic_ns())
 
         with patch.object(dg_main, 'launch_node', side_effect=fake_launch):
             dg_main.main()
         self.assertEqual(calls, ['a.py', 'b.py', 'c.py', 'd.py'])
 
+    def test_critical_path_launched_first(self):
+        # 'short.py' is listed first but 'long.py' heads the longer chain
+        graph = {'max_parallel': 1, 'nodes': {
+            'short.py': {'in': [], 'timeout': 5},
+            'long.py':  {'in': [], 'timeout': 2},
+            'tail.py':  {'in': ['long.py'], 'timeout': 10}
+        }}
+        dg_main.CONFIG_FILE.write_text(json.dumps(graph))
+        for f in graph['nodes']:
+            (self.process_dir / f).write_text('')
+        calls = []
+
+        def fake_launch(node, bench, argv=None):
+            calls.append(node)
+            return (MagicMock(**{'poll.return_value': 0}), time.monotonic_ns())
+
+        with patch.object(dg_main, 'launch_node', side_effect=fake_launch), \
+             patch.object(dg_main, 'wait_for_events', return_value=None):
+            dg_main.main()
+        self.assertEqual(calls, ['long.py', 'tail.py', 'short.py'])
+
+    def test_max_parallel_limits_running_nodes(self):
+        graph = {'max_parallel': 2, 'nodes': {
+            f'{n}.py': {'in': [], 'timeout': None} for n in 'abcde'
+        }}
+        dg_main.CONFIG_FILE.write_text(json.dumps(graph))
+        for f in graph['nodes']:
+            (self.process_dir / f).write_text('')
+        running = []
+        peak = []
+
+        def fake_launch(node, bench, argv=None):
+            running.append(node)
+            peak.append(len(running))
+            P = MagicMock()
+
+            def poll():
+                running.remove(node)
+                return 0
+            P.poll.side_effect = poll
+            return (P, time.monotonic_ns())
+
+        with patch.object(dg_main, 'launch_node', side_effect=fake_launch), \
+             patch.object(dg_main, 'wait_for_events', return_value=None):
+            dg_main.main()
+        self.assertEqual(len(peak), 5)
+        self.assertEqual(max(peak), 2)
+
+    def test_max_parallel_unset_runs_all_ready_nodes(self):
+        # No cap by default, even on a single-CPU host
+        graph = {'nodes': {f'{n}.py': {'in': [], 'timeout': None} for n in 'abc'}}
+        dg_main.CONFIG_FILE.write_text(json.dumps(graph))
+        for f in graph['nodes']:
+            (self.process_dir / f).write_text('')
+        running = []
+        peak = []
+
+        def fake_launch(node, bench, argv=None):
+            running.append(node)
+            peak.append(len(running))
+            P = MagicMock()
+
+            def poll():
+                running.remove(node)
+                return 0
+            P.poll.side_effect = poll
+            return (P, time.monotonic_ns())
+
+        with patch.object(dg_main.os, 'cpu_count', return_value=1), \
+             patch.object(dg_main, 'launch_node', side_effect=fake_launch), \
+             patch.object(dg_main, 'wait_for_events', return_value=None):
+            dg_main.main()
+        self.assertEqual(max(peak), 3)
+
+    def test_max_parallel_below_one_rejected(self):
+        (self.process_dir / 'a.py').write_text('')
+        for value in (0, -1):
+            dg_main.CONFIG_FILE.write_text(json.dumps({'max_parallel': value, 'nodes': {'a.py': {'in': []}}}))
+            with patch.object(dg_main, 'launch_node') as mock_launch, \
+                 self.assertLogs(level='ERROR') as logs, \
+                 self.assertRaises(SystemExit):
+                dg_main.main()
+            mock_launch.assert_not_called()
+            self.assertIn("max_parallel must be a positive integer", logs.output[-1])
+            dg_main.release_lock()
+
+    def test_resource_check_once_per_wave(self):
+        nodes = {f'{n}.py': {'in': [], 'timeout': None} for n in 'abc'}
+        for f in nodes:
+            (self.process_dir / f).write_text('')
+        launched = lambda node, bench, argv=None: (
+            MagicMock(**{'poll.return_value': 0}), time.monotonic_ns())
+        for res_cfg, calls in (({'cpu_percent': 50}, 1), ({'cpu_percent': None}, 0)):
+            dg_main.CONFIG_FILE.write_text(json.dumps({'resources': res_cfg, 'nodes': nodes}))
+            with patch.object(dg_main, 'launch_node', side_effect=launched), \
+                 patch.object(dg_main, 'wait_for_events', return_value=None), \
+                 patch.object(dg_main, 'wait_for_resources') as mock_wait:
+                dg_main.main()
+            self.assertEqual(mock_wait.call_count, calls)
+
     @patch('time.sleep', return_value=None)
     def test_resource_timeout_abort(self, mock_sleep):
         # Include a small deadline to ensure the resource wait will timeout
@@ -257,8 +541,106 @@ class TestDirectedGraphSystem(unittest.TestCase):
         Pfinish.communicate.return_value = ('', '')
         with patch.object(dg_main.psutil, 'cpu_percent', side_effect=fake_cpu), \
              patch('time.sleep', return_value=None), \
-             patch.object(dg_main, 'launch_node', return_value=(Pfinish, datetime.datetime.now())):
+             patch.object(dg_main, 'wait_for_events', return_value=[]), \
+             patch.object(dg_main, 'launch_node', return_value=(Pfinish, time.monotonic_ns())):
+            dg_main.main()
+
+    def test_real_node_output_collected(self):
+        graph = {'nodes': {'a.py': {'in': [], 'timeout': 10}}}
+        dg_main.CONFIG_FILE.write_text(json.dumps(graph))
+        (self.process_dir / 'a.py').write_text("print('hello from a')")
+        start = time.time()
+        dg_main.main()
+        # SIGCHLD wakes the loop well before the MAX_WAIT fallback would
+        self.assertLess(time.time() - start, 5)
+        dg_main.stop_logging()
+        main_log = dg_main.MAIN_LOG.read_text()
+        self.assertIn(f"a.py ok (log={dg_main.NODE_LOG_DIR / 'a.py.out'})", main_log)
+        self.assertNotIn('hello from a', main_log)
+        self.assertEqual((dg_main.NODE_LOG_DIR / 'a.py.out').read_text().strip(), 'hello from a')
+
+    def test_nested_node_logs_to_subdirectory(self):
+        graph = {'nodes': {'sub/a.py': {'in': [], 'timeout': 10}}}
+        dg_main.CONFIG_FILE.write_text(json.dumps(graph))
+        (self.process_dir / 'sub').mkdir()
+        self.addCleanup(shutil.rmtree, self.process_dir / 'sub')
+        (self.process_dir / 'sub' / 'a.py').write_text("print('hello from sub')")
+        dg_main.main()
+        dg_main.stop_logging()
+        self.assertIn("sub/a.py ok", dg_main.MAIN_LOG.read_text())
+        self.assertEqual((dg_main.NODE_LOG_DIR / 'sub' / 'a.py.out').read_text().strip(), 'hello from sub')
+
+    def test_node_stats_caches_handle(self):
+        proc = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+        try:
+            stats = dg_main.node_stats(proc.pid)
+            self.assertEqual(set(stats), {'status', 'cpu_s', 'rss_mb'})
+            handle = dg_main._PROC_HANDLES[proc.pid]
+            dg_main.node_stats(proc.pid)
+            self.assertIs(dg_main._PROC_HANDLES[proc.pid], handle)
+        finally:
+            proc.kill()
+            proc.wait()
+            dg_main._PROC_HANDLES.pop(proc.pid, None)
+        self.assertIsNone(dg_main.node_stats(proc.pid))
+        self.assertIsNone(dg_main.node_stats(None))
+
+    @unittest.skipUnless(hasattr(dg_main.signal, 'setitimer'), "setitimer not available")
+    def test_global_deadline_kills_running_nodes(self):
+        graph = {'deadline_seconds': 1.0, 'nodes': {'a.py': {'in': [], 'timeout': None}}}
+        dg_main.CONFIG_FILE.write_text(json.dumps(graph))
+        pid_file = self.tmpdir / 'a.pid'
+        (self.process_dir / 'a.py').write_text(
+            f"import os, time; open({str(pid_file)!r}, 'w').write(str(os.getpid())); time.sleep(30)")
+        start = time.time()
+        with self.assertRaises(SystemExit):
+            dg_main.main()
+        self.assertLess(time.time() - start, 5)
+        self.assertFalse(dg_main.psutil.pid_exists(int(pid_file.read_text())))
+        self.assertEqual(dg_main.signal.getitimer(dg_main.signal.ITIMER_REAL), (0.0, 0.0))
+        dg_main.stop_logging()
+        self.assertIn("Global deadline exceeded", dg_main.ERROR_LOG.read_text())
+
+    @unittest.skipUnless(hasattr(dg_main.signal, 'setitimer'), "setitimer not available")
+    def test_global_deadline_during_launch_kills_started_nodes(self):
+        # The alarm fires while b.py is still being spawned: the launch must not
+        # be reported as failed, and a.py (already running) must still be killed
+        graph = {'deadline_seconds': 0.3, 'max_parallel': 2,
+                 'nodes': {'a.py': {'in': [], 'timeout': None}, 'b.py': {'in': [], 'timeout': None}}}
+        dg_main.CONFIG_FILE.write_text(json.dumps(graph))
+        pids = []
+        for name in ('a.py', 'b.py'):
+            (self.process_dir / name).write_text("import time; time.sleep(30)")
+        real_popen = subprocess.Popen
+
+        def slow_popen(argv, **kwargs):
+            if argv[1].endswith('b.py'):
+                time.sleep(0.5)
+            proc = real_popen(argv, **kwargs)
+            pids.append(proc.pid)
+            return proc
+        with patch.object(dg_main.subprocess, 'Popen', side_effect=slow_popen), \
+             self.assertRaises(SystemExit):
+            dg_main.main()
+        self.assertEqual(len(pids), 2)
+        for pid in pids:
+            self.assertFalse(dg_main.psutil.pid_exists(pid))
+        dg_main.stop_logging()
+        error_log = dg_main.ERROR_LOG.read_text()
+        self.assertIn("Global deadline exceeded", error_log)
+        self.assertNotIn("Failed to start", error_log)
+
+    def test_failed_node_logs_stderr_tail(self):
+        graph = {'nodes': {'a.py': {'in': [], 'timeout': 10}}}
+        dg_main.CONFIG_FILE.write_text(json.dumps(graph))
+        (self.process_dir / 'a.py').write_text("import sys; sys.stderr.write('x' * 100000 + 'END'); sys.exit(3)")
+        with self.assertRaises(SystemExit):
             dg_main.main()
+        dg_main.stop_logging()
+        error_log = dg_main.ERROR_LOG.read_text()
+        self.assertIn('a.py failed (code 3)', error_log)
+        self.assertIn('END', error_log)
+        self.assertLess(error_log.count('x'), dg_main.TAIL_BYTES + 10)
 
 if __name__=='__main__':
     unittest.main(verbosity=2)
@@ -7,14 +7,45 @@ Refactored main.py for matrix_system:
 import os
 import sys
 import atexit
+import errno
+import selectors
 import subprocess
 import logging
+import logging.handlers
+import queue
 import json
+import functools
 import datetime
+import multiprocessing
+import runpy
+import time
+from collections import deque
 from pathlib import Path
-
-# Track if this process successfully acquired the lock
+from typing import Optional, TypedDict
+
+# Optional fast JSON decoder with schema validation; falls back to the stdlib json module
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Advisory file locking: fcntl on POSIX, msvcrt on Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Track if this process successfully acquired the lock, and the descriptor holding it
 HAS_LOCK = False
+LOCK_FD = None
+
+# Background threads writing root log records and benchmarks.log
+LOG_LISTENER = None
+BENCH_LISTENER = None
+
+# forkserver context batch scripts are forked from; None → fresh interpreter per script
+WARM_CTX = None
 
 
 # Directories
@@ -26,191 +57,454 @@ PROCESS_DIR = PROJECT_ROOT / 'process_files' # process_files/ next to matrix_sys
 LOCK_FILE = BASE_DIR / 'main.lock'
 CONFIG_FILE = BASE_DIR / 'config.json'
 SEPARATOR = '-' * 30  # separator for logs
+READ_CHUNK = 65536    # bytes read from a child pipe per ready event
+
+
+# One formatter shared by the console, main.log and error.log handlers
+_FMT = logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
 
 
 def setup_logging():
-    """Configure logging to console, main.log, and error.log."""
+    """Configure logging to console, main.log, and error.log through a listener thread."""
+    global LOG_LISTENER
+    if LOG_LISTENER is not None:
+        return
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
 
     # Main log
     main_log = BASE_DIR / 'main.log'
     main_handler = logging.FileHandler(main_log, mode='a')
-    main_handler.setFormatter(formatter)
-    logger.addHandler(main_handler)
+    main_handler.setFormatter(_FMT)
 
     # Console log
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    console_handler.setFormatter(_FMT)
 
     # Error log
     error_log = BASE_DIR / 'error.log'
     error_handler = logging.FileHandler(error_log, mode='a')
     error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(formatter)
-    logger.addHandler(error_handler)
+    error_handler.setFormatter(_FMT)
+
+    q = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(q))
+    LOG_LISTENER = logging.handlers.QueueListener(
+        q, main_handler, console_handler, error_handler, respect_handler_level=True
+    )
+    LOG_LISTENER.start()
+
+
+class BenchmarkFormatter(logging.Formatter):
+    """Timestamped benchmarks.log lines; SEPARATOR lines are written bare."""
+
+    def format(self, record):
+        if record.msg == SEPARATOR and not record.args:
+            return SEPARATOR
+        return super().format(record)
+
+
+_BENCH_FMT = BenchmarkFormatter('%(asctime)s: %(message)s')
 
 
 def setup_benchmark_logging():
-    """Set up a dedicated benchmark logger writing to benchmarks.log."""
+    """Set up a dedicated benchmark logger writing to benchmarks.log from a listener thread."""
+    global BENCH_LISTENER
     benchmark_logger = logging.getLogger('benchmark')
+    if BENCH_LISTENER is not None:
+        return benchmark_logger
     benchmark_logger.setLevel(logging.INFO)
     bench_log = BASE_DIR / 'benchmarks.log'
     bh = logging.FileHandler(bench_log, mode='a')
     bh.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s: %(message)s')
-    bh.setFormatter(formatter)
-    benchmark_logger.addHandler(bh)
+    bh.setFormatter(_BENCH_FMT)
+    q = queue.Queue(-1)
+    benchmark_logger.addHandler(logging.handlers.QueueHandler(q))
+    BENCH_LISTENER = logging.handlers.QueueListener(q, bh)
+    BENCH_LISTENER.start()
     return benchmark_logger
 
 
+def _stop_listener(logger, listener):
+    """Remove logger's QueueHandler, then stop listener and close its handlers."""
+    for h in list(logger.handlers):
+        if isinstance(h, logging.handlers.QueueHandler) and h.queue is listener.queue:
+            logger.removeHandler(h)
+    listener.stop()
+    for h in listener.handlers:
+        h.close()
+
+
+def stop_logging():
+    """Write out pending log records and stop both listener threads (registered with atexit)."""
+    global LOG_LISTENER, BENCH_LISTENER
+    if BENCH_LISTENER is not None:
+        _stop_listener(logging.getLogger('benchmark'), BENCH_LISTENER)
+        BENCH_LISTENER = None
+    if LOG_LISTENER is not None:
+        _stop_listener(logging.getLogger(), LOG_LISTENER)
+        LOG_LISTENER = None
+
+
+def describe_holder(pid_text):
+    """Describe the PID recorded in a held lock file for the lock error message.
+
+    The flock is authoritative; this is diagnostics only. os.kill(pid, 0) tells
+    a live process owned by another user (EPERM) apart from a PID that has
+    already exited (ESRCH). Skipped on Windows, where signal 0 is CTRL_C_EVENT."""
+    try:
+        pid = int(pid_text)
+    except ValueError:
+        return 'unknown'
+    if fcntl is None:
+        return str(pid)
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        if e.errno == errno.EPERM:
+            return f"{pid} (different user)"
+        if e.errno == errno.ESRCH:
+            return f"unknown (recorded PID {pid} has exited)"
+        raise
+    return str(pid)
+
+
 def acquire_lock():
-    """Acquire a lock by creating a lock file, checking for stale processes."""
-    # If lock exists, check if PID inside is still running
-    if LOCK_FILE.exists():
-        try:
-            existing_pid = int(LOCK_FILE.read_text())
-            # os.kill(pid, 0) raises OSError if process does not exist or no permission
-            os.kill(existing_pid, 0)
-            logging.error(f"Lock file exists and process {existing_pid} is still running. Exiting.")
-            sys.exit(1)
-        except ValueError:
-            logging.warning(f"Lock file {LOCK_FILE} contains invalid PID. Removing stale lock.")
-            LOCK_FILE.unlink()
-        except OSError:
-            # Process not running; stale lock
-            logging.warning(f"Stale lock detected for PID {existing_pid}. Removing lock file.")
-            LOCK_FILE.unlink()
-        except Exception as e:
-            logging.error(f"Error checking existing lock: {e}")
-            sys.exit(1)
+    """Take an exclusive, non-blocking advisory lock on the lock file for the life of the process.
 
+    The kernel releases the lock if the process dies, so there is no stale-lock
+    cleanup. The PID is written into the file only as a debugging aid."""
+    global HAS_LOCK, LOCK_FD
     try:
-        LOCK_FILE.write_text(str(os.getpid()))
-        global HAS_LOCK
-        HAS_LOCK = True
-        logging.info(f"Acquired lock with file {LOCK_FILE} (PID: {os.getpid()}).")
-    except Exception as e:
-        logging.error(f"Failed to create lock file: {e}")
+        fd = os.open(LOCK_FILE, os.O_CREAT | os.O_RDWR, 0o644)
+    except OSError as e:
+        logging.error("Failed to create lock file: %s", e)
         sys.exit(1)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        os.close(fd)
+        try:
+            holder = describe_holder(LOCK_FILE.read_text().strip())
+        except OSError:
+            holder = 'unknown'
+        logging.error("Lock is held (holder: %s). Exiting.", holder)
+        sys.exit(1)
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    LOCK_FD = fd
+    HAS_LOCK = True
+    logging.info("Acquired lock with file %s (PID: %s).", LOCK_FILE, os.getpid())
 
-# Register release_lock to run on normal exit
 def release_lock():
-    """Remove the lock file if this process holds it."""
-    global HAS_LOCK
+    """Release the lock by closing its descriptor if this process holds it.
+
+    The file itself is left in place: unlinking it would let a process that
+    already opened the old file and a new one each hold a lock at once."""
+    global HAS_LOCK, LOCK_FD
     if not HAS_LOCK:
-        # Skip removal: this process never acquired the lock
+        # Skip: this process never acquired the lock
         return
     try:
-        if LOCK_FILE.exists():
-            LOCK_FILE.unlink()
-            logging.info(f"Released lock and removed {LOCK_FILE}.")
-    except Exception as e:
-        logging.error(f"Failed to remove lock file: {e}")
-
-# Register release_lock to run on normal exit
+        os.close(LOCK_FD)
+        logging.info("Released lock on %s.", LOCK_FILE)
+    except OSError as e:
+        logging.error("Failed to release lock: %s", e)
+    LOCK_FD = None
+    HAS_LOCK = False
+
+# Register release_lock to run on normal exit; atexit runs handlers in reverse
+# order, so release_lock still logs before the listener threads are stopped
+atexit.register(stop_logging)
 atexit.register(release_lock)
 
 
+# Config schema; with msgspec installed it is validated while decoding, the result is a plain dict
+class Config(TypedDict, total=False):
+    execution_mode: str
+    max_parallel: Optional[int]
+    forkserver_preload: Optional[list[str]]
+    batches: list[list[str]]
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_config(path_str, mtime_ns, size):
+    """Parse a config file; cached by (path, mtime, size) so an unchanged file is parsed once."""
+    data = Path(path_str).read_bytes()
+    if msgspec is not None:
+        return msgspec.json.decode(data, type=Config)
+    return json.loads(data)
+
+
 def load_config(config_file=None):
     """Load configuration JSON from matrix_system config.
 
     If config_file is provided (str or Path), load from that filename in matrix_system/;
-    otherwise, load from default CONFIG_FILE (matrix_system/config.json)."""
+    otherwise, load from default CONFIG_FILE (matrix_system/config.json).
+    The returned dict is shared with the parse cache; treat it as read-only."""
     try:
         # Determine path to config
         if config_file:
             cfg_path = BASE_DIR / str(config_file)
         else:
             cfg_path = CONFIG_FILE
-        data = cfg_path.read_text(encoding='utf-8')
-        config = json.loads(data)
-        logging.info(f"Loaded configuration from {cfg_path}.")
+        st = cfg_path.stat()
+        config = _parse_config(str(cfg_path), st.st_mtime_ns, st.st_size)
+        logging.info("Loaded configuration from %s.", cfg_path)
         return config
     except Exception as e:
-        logging.error(f"Error reading configuration file {cfg_path}: {e}")
+        logging.error("Error reading configuration file %s: %s", cfg_path, e)
         sys.exit(1)
 
-# Continue with existing run_file definition
-def run_file(script_name, benchmark_logger):
-    """Execute a single script in process_files/ synchronously with timing."""
-    script_path = PROCESS_DIR / script_name
+load_config.cache_clear = _parse_config.cache_clear
+
+def elapsed_since(start_ns):
+    """Monotonic time elapsed since start_ns (a time.monotonic_ns() reading) as a timedelta.
+
+    Wall-clock datetimes are only used for the started/ended timestamps; durations
+    come from the monotonic clock so they are immune to NTP or DST jumps."""
+    return datetime.timedelta(microseconds=(time.monotonic_ns() - start_ns) // 1000)
+
+def script_argvs(batches):
+    """Build the command line of every script in batches once, keyed by script name."""
+    process_dir = str(PROCESS_DIR)
+    return {s: [sys.executable, os.path.join(process_dir, s)] for batch in batches for s in batch}
+
+
+class ScriptLaunchError(Exception):
+    """A batch script could not be spawned."""
+
+
+def start_forkserver(preload):
+    """Run batch scripts as forks of one warm interpreter with preload modules already imported.
+
+    Returns the forkserver context, or None where the start method is unavailable (Windows)."""
+    global WARM_CTX
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        logging.warning("forkserver is not available on this platform; scripts start fresh interpreters.")
+        return None
+    ctx = multiprocessing.get_context('forkserver')
+    # '__main__' keeps this module loaded in the server, so children do not re-import it
+    ctx.set_forkserver_preload(['__main__', *preload])
+    WARM_CTX = ctx
+    logging.info("Forkserver enabled (preload: %s).", ', '.join(preload) or 'none')
+    return ctx
+
+
+def _run_warm(script_path, stdout, stderr):
+    """forkserver child: point fds 1/2 at the batch pipes and run script_path as __main__.
+
+    multiprocessing ends the child with os._exit(), skipping interpreter shutdown,
+    so the script's atexit handlers are run and its output flushed here instead."""
+    os.dup2(stdout.fileno(), 1)
+    os.dup2(stderr.fileno(), 2)
+    stdout.close()
+    stderr.close()
+    sys.argv = [script_path]
+    sys.path[0] = os.path.dirname(script_path)
+    # Handlers inherited from the forkserver belong to this module, not the script
+    atexit._clear()
+    try:
+        runpy.run_path(script_path, run_name='__main__')
+    finally:
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+class WarmProcess:
+    """Popen-like handle on a script forked from the warm forkserver interpreter.
+
+    Offers what collect_outputs() uses: binary stdout/stderr pipes, pid,
+    returncode (negative signal number if killed) and wait()."""
+
+    def __init__(self, ctx, script_path):
+        out_r, out_w = ctx.Pipe(duplex=False)
+        err_r, err_w = ctx.Pipe(duplex=False)
+        self._proc = ctx.Process(target=_run_warm, args=(script_path, out_w, err_w))
+        try:
+            self._proc.start()
+        except BaseException:
+            out_r.close()
+            err_r.close()
+            raise
+        finally:
+            # The child holds its own copies of the write ends
+            out_w.close()
+            err_w.close()
+        # Plain binary files over the read ends, as subprocess.PIPE would give
+        self.stdout = open(os.dup(out_r.fileno()), 'rb', buffering=0)
+        self.stderr = open(os.dup(err_r.fileno()), 'rb', buffering=0)
+        out_r.close()
+        err_r.close()
+        self.pid = self._proc.pid
+
+    @property
+    def returncode(self):
+        return self._proc.exitcode
+
+    def kill(self):
+        self._proc.kill()
+
+    def wait(self):
+        self._proc.join()
+        return self.returncode
+
+
+def spawn_script(script, benchmark_logger, argv=None):
+    """Start one script from process_files/ with piped output; returns (start_ns, proc).
+
+    argv is the prebuilt command line from script_argvs(); built on the fly if omitted.
+    Once start_forkserver() ran, the script is forked from the warm interpreter instead."""
+    if argv is None:
+        argv = [sys.executable, str(PROCESS_DIR / script)]
     start_time = datetime.datetime.now()
-    benchmark_logger.info(f"Script {script_name} started at {start_time}")
+    start_ns = time.monotonic_ns()
+    benchmark_logger.info("Script %s started at %s", script, start_time)
     try:
-        logging.info(f"Starting {script_path} synchronously")
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            check=True,
-            capture_output=True,
-            text=True
+        if WARM_CTX is not None:
+            return start_ns, WarmProcess(WARM_CTX, argv[1])
+        # close_fds=False lets CPython spawn via posix_spawn (vfork) instead of fork+exec;
+        # the pipes subprocess creates are non-inheritable, so nothing leaks into the child
+        proc = subprocess.Popen(
+            argv,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            close_fds=False
         )
-        logging.info(f"Finished {script_path} with output:\n{result.stdout}")
-        success = True
-    except subprocess.CalledProcessError as error:
-        logging.error(f"Error running {script_path}:\n{error.stderr}")
-        success = False
-    end_time = datetime.datetime.now()
-    duration = end_time - start_time
-    benchmark_logger.info(f"Script {script_name} ended at {end_time} with duration {duration}")
-    return success
-
-
-def run_batch_sync(scripts, benchmark_logger):
-    """Run scripts one after another (sync)."""
+    except Exception as e:
+        raise ScriptLaunchError(f"{script}: {e}") from e
+    return start_ns, proc
+
+
+def _kill_unfinished(procs):
+    """Kill and reap every process in procs; ones that already exited are just reaped."""
+    for proc in procs:
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except OSError:
+                pass
+        proc.wait()
+        for pipe in (proc.stdout, proc.stderr):
+            if pipe is not None:
+                pipe.close()
+
+
+def collect_outputs(scripts, max_concurrency, benchmark_logger, argvs=None):
+    """Launch scripts with at most max_concurrency alive at once and yield
+    (script, start_ns, proc, stdout, stderr) for each as it finishes.
+
+    Every stdout/stderr pipe is registered on one selector and drained as data
+    arrives, so a slow script never holds up the results of the others and no
+    child stalls on a full pipe. A script is reaped once both of its pipes hit
+    EOF, and its slot goes to the next pending script. Nothing new is launched
+    once the caller stops iterating. On Windows, where pipes cannot be
+    selected, scripts are collected with communicate() in launch order.
+    Scripts still running when the caller stops iterating are killed and reaped."""
+    pending = deque(scripts)
+    argvs = argvs or {}
+    if os.name == 'nt':
+        running = deque()
+        try:
+            while pending or running:
+                while pending and len(running) < max_concurrency:
+                    script = pending.popleft()
+                    running.append((script, *spawn_script(script, benchmark_logger, argvs.get(script))))
+                script, start_ns, proc = running[0]
+                stdout, stderr = proc.communicate()
+                running.popleft()
+                yield script, start_ns, proc, stdout.decode(errors='replace'), stderr.decode(errors='replace')
+        finally:
+            _kill_unfinished(proc for _, _, proc in running)
+        return
+
+    sel = selectors.DefaultSelector()
+    buffers = {}
+    try:
+        while pending or buffers:
+            # Fill free slots before waiting on output
+            while pending and len(buffers) < max_concurrency:
+                script = pending.popleft()
+                start_ns, proc = spawn_script(script, benchmark_logger, argvs.get(script))
+                buffers[proc] = ([], [])
+                for stream, pipe in enumerate((proc.stdout, proc.stderr)):
+                    # Non-blocking, so a spurious readiness report can never stall the loop
+                    os.set_blocking(pipe.fileno(), False)
+                    sel.register(pipe, selectors.EVENT_READ, (script, start_ns, proc, stream))
+            for key, _ in sel.select():
+                script, start_ns, proc, stream = key.data
+                try:
+                    chunk = os.read(key.fd, READ_CHUNK)
+                except BlockingIOError:
+                    continue
+                if chunk:
+                    buffers[proc][stream].append(chunk)
+                    continue
+                sel.unregister(key.fileobj)
+                key.fileobj.close()
+                if proc.stdout.closed and proc.stderr.closed:
+                    proc.wait()
+                    out, err = buffers.pop(proc)
+                    yield (script, start_ns, proc,
+                           b''.join(out).decode(errors='replace'),
+                           b''.join(err).decode(errors='replace'))
+    finally:
+        # Scripts left behind when the caller bails out early must not outlive the
+        # batch: kill and reap them before closing the pipes they write to
+        _kill_unfinished(buffers)
+        for key in list(sel.get_map().values()):
+            key.fileobj.close()
+        sel.close()
+
+
+def _run_batch(scripts, max_concurrency, benchmark_logger, argvs=None):
+    """Run one batch with at most max_concurrency scripts alive; stop at the first failure.
+
+    Sync mode is max_concurrency=1: each script starts only after the previous
+    one succeeded. Async mode runs the batch as wide as allowed and handles
+    results in completion order."""
     batch_start = datetime.datetime.now()
-    benchmark_logger.info(f"Batch started at {batch_start}")
-    for script in scripts:
-        if not run_file(script, benchmark_logger):
-            logging.error("Batch halted due to an error.")
-            return False
+    batch_start_ns = time.monotonic_ns()
+    benchmark_logger.info("Batch started at %s", batch_start)
+    try:
+        for script, start_ns, proc, stdout, stderr in collect_outputs(
+                scripts, max(max_concurrency, 1), benchmark_logger, argvs):
+            end_time = datetime.datetime.now()
+            benchmark_logger.info("Script %s ended at %s with duration %s", script, end_time, elapsed_since(start_ns))
+            if proc.returncode == 0:
+                logging.info("Finished %s with output:\n%s", script, stdout)
+            else:
+                logging.error("Error running %s:\n%s", script, stderr)
+                logging.error("Batch halted due to an error.")
+                return False
+    except ScriptLaunchError as e:
+        logging.error("Failed to start %s", e)
+        return False
     batch_end = datetime.datetime.now()
-    benchmark_logger.info(f"Batch ended at {batch_end} with duration {batch_end - batch_start}")
+    benchmark_logger.info("Batch ended at %s with duration %s", batch_end, elapsed_since(batch_start_ns))
     benchmark_logger.info(SEPARATOR)
     return True
 
 
-def run_batch_async(scripts, benchmark_logger):
-    """Run scripts concurrently (async) and wait for completion."""
-    batch_start = datetime.datetime.now()
-    benchmark_logger.info(f"Batch started at {batch_start}")
-    processes = []
-    for script in scripts:
-        start_time = datetime.datetime.now()
-        benchmark_logger.info(f"Script {script} started at {start_time}")
-        try:
-            proc = subprocess.Popen(
-                [sys.executable, str(PROCESS_DIR / script)],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            processes.append((script, start_time, proc))
-        except Exception as e:
-            logging.error(f"Failed to start {script}: {e}")
-            return False
-    for script, start_time, proc in processes:
-        stdout, stderr = proc.communicate()
-        end_time = datetime.datetime.now()
-        benchmark_logger.info(f"Script {script} ended at {end_time} with duration {end_time - start_time}")
-        if proc.returncode == 0:
-            logging.info(f"Finished {script} with output:\n{stdout}")
-        else:
-            logging.error(f"Error running {script}:\n{stderr}")
-            return False
-    batch_end = datetime.datetime.now()
-    benchmark_logger.info(f"Batch ended at {batch_end} with duration {batch_end - batch_start}")
-    benchmark_logger.info(SEPARATOR)
-    return True
+def run_batch_sync(scripts, benchmark_logger, argvs=None):
+    """Run scripts one after another (sync)."""
+    return _run_batch(scripts, 1, benchmark_logger, argvs)
+
+
+def run_batch_async(scripts, benchmark_logger, max_parallel=None, argvs=None):
+    """Run scripts concurrently (async), at most max_parallel at once (default: whole batch)."""
+    return _run_batch(scripts, max_parallel or len(scripts), benchmark_logger, argvs)
 
 
-def run_batch(scripts, execution_mode, benchmark_logger):
+def run_batch(scripts, execution_mode, benchmark_logger, max_parallel=None, argvs=None):
     """Dispatch batch execution based on mode."""
     if execution_mode.lower() == 'async':
-        return run_batch_async(scripts, benchmark_logger)
-    return run_batch_sync(scripts, benchmark_logger)
+        return run_batch_async(scripts, benchmark_logger, max_parallel, argvs)
+    return run_batch_sync(scripts, benchmark_logger, argvs)
 
 
 def main():
@@ -221,20 +515,26 @@ def main():
 
     execution_mode = config.get('execution_mode', 'sync')
     batches = config.get('batches', [])
-    logging.info(f"Execution mode: {execution_mode}")
+    max_parallel = config.get('max_parallel')
+    argvs = script_argvs(batches)
+    preload = config.get('forkserver_preload')
+    if preload is not None:
+        start_forkserver(preload)
+    logging.info("Execution mode: %s", execution_mode)
 
     process_start = datetime.datetime.now()
-    benchmark_logger.info(f"Process started at {process_start} (Mode: {execution_mode.upper()})")
+    process_start_ns = time.monotonic_ns()
+    benchmark_logger.info("Process started at %s (Mode: %s)", process_start, execution_mode.upper())
     benchmark_logger.info(SEPARATOR)
 
     for idx, batch in enumerate(batches, 1):
-        logging.info(f"Starting Batch {idx}")
-        benchmark_logger.info(f"Starting Batch {idx}")
-        if not run_batch(batch, execution_mode, benchmark_logger):
-            logging.error(f"Batch {idx} failed. Aborting.")
+        logging.info("Starting Batch %s", idx)
+        benchmark_logger.info("Starting Batch %s", idx)
+        if not run_batch(batch, execution_mode, benchmark_logger, max_parallel, argvs):
+            logging.error("Batch %s failed. Aborting.", idx)
             break
     process_end = datetime.datetime.now()
-    benchmark_logger.info(f"Process ended at {process_end} with duration {process_end - process_start}")
+    benchmark_logger.info("Process ended at %s with duration %s", process_end, elapsed_since(process_start_ns))
     benchmark_logger.info(SEPARATOR)
 
 
@@ -2,18 +2,21 @@ import unittest
 import subprocess
 import json
 import os
+import errno
 import sys
-from io import StringIO
+import time
+import tempfile
+import logging
 from pathlib import Path
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 
 """
 Run it like: python3 -m unittest discover -v
 """
 
 # Import from the refactored module
+import matrix_system.main as matrix_main
 from matrix_system.main import (
-    run_file,
     run_batch_sync,
     run_batch_async,
     load_config,
@@ -21,19 +24,20 @@ from matrix_system.main import (
     release_lock,
     LOCK_FILE,
     PROCESS_DIR,
-    CONFIG_FILE,
-    HAS_LOCK
+    CONFIG_FILE
 )
 
 class TestMatrixSystemMain(unittest.TestCase):
-    def setUp(self):
-        # Redirect benchmark logs to a StringIO for inspection
-        self.log_stream = StringIO()
-        self.bench_logger = unittest.mock.MagicMock()
-        handler = unittest.mock.MagicMock()
-        handler.stream = self.log_stream
-        self.bench_logger.handlers = [handler]
+    @classmethod
+    def setUpClass(cls):
+        # One real benchmark logger for all tests; records are dropped unless a test captures them
+        cls.bench_logger = logging.getLogger('bench_test')
+        cls.bench_logger.setLevel(logging.INFO)
+        cls.bench_logger.propagate = False
+        if not cls.bench_logger.handlers:
+            cls.bench_logger.addHandler(logging.NullHandler())
 
+    def setUp(self):
         # Ensure clean slate for lock file
         if LOCK_FILE.exists():
             LOCK_FILE.unlink()
@@ -47,60 +51,135 @@ class TestMatrixSystemMain(unittest.TestCase):
         if tmp.exists():
             tmp.unlink()
 
-    @patch('matrix_system.main.subprocess.run')
-    def test_run_file_success(self, mock_run):
-        # Simulate successful run
-        result_obj = MagicMock(stdout="OK", returncode=0)
-        mock_run.return_value = result_obj
-
-        ok = run_file("dummy.py", self.bench_logger)
-        self.assertTrue(ok)
-        mock_run.assert_called_once_with(
-            [sys.executable, str(PROCESS_DIR / "dummy.py")],
-            check=True, capture_output=True, text=True
-        )
-
-    @patch('matrix_system.main.subprocess.run')
-    def test_run_file_failure(self, mock_run):
-        # Simulate CalledProcessError
-        mock_run.side_effect = subprocess.CalledProcessError(
-            returncode=1, cmd="cmd", stderr="ERR"
-        )
-        ok = run_file("fail.py", self.bench_logger)
-        self.assertFalse(ok)
-
-    @patch('matrix_system.main.run_file')
-    def test_run_batch_sync_all_ok(self, mock_run_file):
-        mock_run_file.return_value = True
+    def write_scripts(self, **sources):
+        # Real scripts in a scratch process_files/ so the async runner drives real pipes
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, source in sources.items():
+            (Path(tmp.name) / f"{name}.py").write_text(source)
+        patcher = patch('matrix_system.main.PROCESS_DIR', Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_run_batch_sync_all_ok(self):
+        self.write_scripts(a="", b="")
         ok = run_batch_sync(["a.py","b.py"], self.bench_logger)
         self.assertTrue(ok)
 
-    @patch('matrix_system.main.run_file')
-    def test_run_batch_sync_failure(self, mock_run_file):
-        # Second script fails
-        mock_run_file.side_effect = [True, False]
-        ok = run_batch_sync(["a.py","b.py"], self.bench_logger)
+    def test_run_batch_sync_failure(self):
+        # Second script fails; the third is never started
+        self.write_scripts(a="", b="import sys; sys.exit(1)", c="")
+        with self.assertLogs(level='ERROR'), \
+             self.assertLogs('bench_test', level='INFO') as bench:
+            ok = run_batch_sync(["a.py","b.py","c.py"], self.bench_logger)
         self.assertFalse(ok)
+        started = [r.args[0] for r in bench.records if r.msg.startswith("Script %s started")]
+        self.assertEqual(started, ["a.py", "b.py"])
 
-    @patch('matrix_system.main.subprocess.Popen')
-    def test_run_batch_async_success(self, mock_popen):
-        proc = MagicMock()
-        proc.communicate.return_value = ("out","")
-        proc.returncode = 0
-        mock_popen.return_value = proc
+    def test_run_batch_async_respects_max_parallel(self):
+        self.write_scripts(**{n: "import time; time.sleep(0.2)" for n in "abcd"})
+        start = time.monotonic()
+        ok = run_batch_async(["a.py","b.py","c.py","d.py"], self.bench_logger, max_parallel=2)
+        self.assertTrue(ok)
+        # Two waves of two, not one wave of four
+        self.assertGreaterEqual(time.monotonic() - start, 0.4)
+
+    def test_run_batch_uses_prebuilt_argvs(self):
+        self.write_scripts(a="")
+        argvs = matrix_main.script_argvs([["a.py"], ["a.py", "b.py"]])
+        self.assertEqual(argvs["a.py"], [sys.executable, str(matrix_main.PROCESS_DIR / "a.py")])
+        self.assertEqual(list(argvs), ["a.py", "b.py"])
+        with patch('matrix_system.main.subprocess.Popen', wraps=subprocess.Popen) as spy:
+            self.assertTrue(run_batch_sync(["a.py"], self.bench_logger, argvs))
+        self.assertIs(spy.call_args.args[0], argvs["a.py"])
+        # No cwd/preexec_fn and close_fds=False keep CPython on its posix_spawn path
+        self.assertIs(spy.call_args.kwargs['close_fds'], False)
+        self.assertFalse({'cwd', 'preexec_fn'} & spy.call_args.kwargs.keys())
+
+    def test_run_batch_launch_failure(self):
+        self.write_scripts(a="")
+        with patch('matrix_system.main.subprocess.Popen', side_effect=OSError("no exec")), \
+             self.assertLogs(level='ERROR') as logs:
+            ok = run_batch_async(["a.py"], self.bench_logger)
+        self.assertFalse(ok)
+        self.assertIn("Failed to start a.py: no exec", logs.output[0])
 
-        ok = run_batch_async(["x.py","y.py"], self.bench_logger)
+    def test_run_batch_async_success(self):
+        # Output larger than a pipe buffer must not stall the child
+        self.write_scripts(x="print('x' * 200000)", y="print('y')")
+        with self.assertLogs(level='INFO') as logs:
+            ok = run_batch_async(["x.py","y.py"], self.bench_logger)
         self.assertTrue(ok)
+        self.assertTrue(any('x' * 200000 in line for line in logs.output))
 
-    @patch('matrix_system.main.subprocess.Popen')
-    def test_run_batch_async_failure(self, mock_popen):
+    def test_run_batch_async_failure(self):
         # First OK, second fails
-        p1 = MagicMock(); p1.communicate.return_value = ("",""); p1.returncode = 0
-        p2 = MagicMock(); p2.communicate.return_value = ("","err"); p2.returncode = 1
-        mock_popen.side_effect = [p1, p2]
+        self.write_scripts(x="", y="import sys; sys.stderr.write('err'); sys.exit(1)")
+        with self.assertLogs(level='ERROR') as logs:
+            ok = run_batch_async(["x.py","y.py"], self.bench_logger)
+        self.assertFalse(ok)
+        self.assertIn("err", logs.output[-1])
 
-        ok = run_batch_async(["x.py","y.py"], self.bench_logger)
+    def test_run_batch_async_reports_in_completion_order(self):
+        self.write_scripts(slow="import time; time.sleep(1)", fast="import sys; sys.exit(2)")
+        start = time.monotonic()
+        with self.assertLogs(level='ERROR'):
+            ok = run_batch_async(["slow.py","fast.py"], self.bench_logger)
         self.assertFalse(ok)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_run_batch_async_failure_leaves_no_children(self):
+        # The slow sibling of a failed script is killed and reaped, not left running
+        self.write_scripts(slow="import time\nfor _ in range(50):\n    print('tick', flush=True)\n    time.sleep(0.1)",
+                           fast="import sys; sys.exit(2)")
+        procs = []
+        real_popen = subprocess.Popen
+
+        def popen(*args, **kwargs):
+            procs.append(real_popen(*args, **kwargs))
+            return procs[-1]
+        with patch('matrix_system.main.subprocess.Popen', side_effect=popen), \
+             self.assertLogs(level='ERROR'):
+            self.assertFalse(run_batch_async(["slow.py","fast.py"], self.bench_logger))
+        self.assertEqual(len(procs), 2)
+        for proc in procs:
+            self.assertIsNotNone(proc.returncode)
+            self.assertTrue(proc.stdout.closed and proc.stderr.closed)
+        self.assertLess(procs[0].returncode, 0)
+
+    @unittest.skipUnless('forkserver' in matrix_main.multiprocessing.get_all_start_methods(),
+                         "forkserver not available")
+    def test_run_batch_forkserver(self):
+        # Scripts forked from the warm interpreter still report output and exit codes
+        self.write_scripts(ok="import atexit, json, sys\natexit.register(sys.stdout.write, 'bye')\nprint(__name__, json.dumps(1))",
+                           bad="import sys; sys.stderr.write('boom'); sys.exit(3)")
+        patcher = patch('matrix_system.main.WARM_CTX', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.assertIsNotNone(matrix_main.start_forkserver(['json']))
+        with self.assertLogs(level='INFO') as logs:
+            self.assertTrue(run_batch_async(["ok.py"], self.bench_logger))
+        self.assertTrue(any("__main__ 1" in line for line in logs.output))
+        # atexit handlers run and their unflushed output still arrives, as in a cold run
+        self.assertTrue(any(line.endswith("__main__ 1\nbye") for line in logs.output))
+        with patch('matrix_system.main.subprocess.Popen') as popen, \
+             self.assertLogs(level='ERROR') as logs:
+            self.assertFalse(run_batch_sync(["bad.py"], self.bench_logger))
+        popen.assert_not_called()
+        self.assertIn("boom", logs.output[0])
+
+    def test_benchmark_logging_through_listener(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with patch('matrix_system.main.BASE_DIR', Path(tmp.name)):
+            bench = matrix_main.setup_benchmark_logging()
+            self.assertIs(matrix_main.setup_benchmark_logging(), bench)
+            bench.info("Batch started")
+            bench.info(matrix_main.SEPARATOR)
+            matrix_main.stop_logging()
+        lines = (Path(tmp.name) / 'benchmarks.log').read_text().splitlines()
+        self.assertTrue(lines[0].endswith(": Batch started"))
+        self.assertEqual(lines[1], matrix_main.SEPARATOR)
 
     def test_load_config_valid(self):
         data = {"execution_mode":"sync","batches":[["f.py"]]}
@@ -110,35 +189,59 @@ class TestMatrixSystemMain(unittest.TestCase):
         cfg = load_config(tmp.name)
         self.assertEqual(cfg, data)
 
+    @unittest.skipIf(matrix_main.msgspec is None, "msgspec not installed")
+    def test_load_config_rejects_bad_schema(self):
+        tmp = CONFIG_FILE.parent / 'temp_test_config.json'
+        tmp.write_text(json.dumps({"execution_mode": "sync", "batches": ["f.py"]}))
+        with self.assertRaises(SystemExit):
+            load_config(tmp.name)
+
     def test_acquire_lock_and_stale_cleanup(self):
-        # Write a stale PID
+        # Leftover file from a dead process is not locked, so it is simply reused
         LOCK_FILE.write_text("999999")
-        # Patch os.kill to throw OSError (process not found)
-        with patch('matrix_system.main.os.kill', side_effect=OSError):
-            # Should remove stale lock and then recreate it
-            acquire_lock()
-            pid_text = LOCK_FILE.read_text().strip()
-            self.assertEqual(pid_text, str(os.getpid()))
+        acquire_lock()
+        self.assertTrue(matrix_main.HAS_LOCK)
+        pid_text = LOCK_FILE.read_text().strip()
+        self.assertEqual(pid_text, str(os.getpid()))
+        release_lock()
 
     def test_acquire_lock_active_process_blocks(self):
-        # Write a fake active PID (patch os.kill to do nothing)
+        # A live holder of the lock blocks acquisition
         LOCK_FILE.write_text("1234")
-        with patch('matrix_system.main.os.kill', return_value=None):
+        with open(LOCK_FILE, 'r+') as holder:
+            if matrix_main.fcntl is not None:
+                matrix_main.fcntl.flock(holder.fileno(), matrix_main.fcntl.LOCK_EX | matrix_main.fcntl.LOCK_NB)
+            else:
+                matrix_main.msvcrt.locking(holder.fileno(), matrix_main.msvcrt.LK_NBLCK, 1)
             with self.assertRaises(SystemExit):
                 acquire_lock()
+            self.assertFalse(matrix_main.HAS_LOCK)
 
         # Lock file remains
         self.assertTrue(LOCK_FILE.exists())
 
+    def test_describe_holder_errno(self):
+        self.assertEqual(matrix_main.describe_holder("junk"), "unknown")
+        self.assertEqual(matrix_main.describe_holder(str(os.getpid())), str(os.getpid()))
+        if matrix_main.fcntl is None:
+            return
+        with patch('matrix_system.main.os.kill', side_effect=PermissionError(errno.EPERM, "denied")):
+            self.assertEqual(matrix_main.describe_holder("1"), "1 (different user)")
+        with patch('matrix_system.main.os.kill', side_effect=ProcessLookupError(errno.ESRCH, "gone")):
+            self.assertIn("has exited", matrix_main.describe_holder("999999"))
+
     def test_release_lock(self):
         # First acquire the lock so HAS_LOCK=True and the file exists
         acquire_lock()
         self.assertTrue(LOCK_FILE.exists())
         # Now release it
         release_lock()
-        self.assertFalse(LOCK_FILE.exists())
-        # And confirm HAS_LOCK was reset (optional)
-        self.assertFalse(HAS_LOCK)
+        self.assertFalse(matrix_main.HAS_LOCK)
+        self.assertIsNone(matrix_main.LOCK_FD)
+        # Released lock can be taken again
+        acquire_lock()
+        self.assertTrue(matrix_main.HAS_LOCK)
+        release_lock()
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -1,16 +1,17 @@
 import json
 import time
+from array import array
 
 def get_ids():
     # Simulate a delay for the API call
     time.sleep(4)
-    # For demonstration purposes, generate 100 IDs.
-    return [i for i in range(1, 101)]
+    # For demonstration purposes, generate 100 IDs as packed int64s.
+    return array('q', range(1, 101))
 
 def main():
     ids = get_ids()
     # Print the IDs as a JSON string so the main script can parse it
-    print(json.dumps(ids))
+    print(json.dumps(ids.tolist()))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
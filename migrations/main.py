@@ -1,21 +1,65 @@
 import json
-import subprocess
-from typing import List, Union
+import functools
+import importlib
+import multiprocessing
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import List, Optional, TypedDict, Union
 import sys
 import logging
-import datetime
+import logging.handlers
+import time
 import os
 import atexit
 import psutil  # pip install psutil
 
+# Optional fast JSON decoder with schema validation; falls back to the stdlib json module
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Advisory file locking: fcntl on POSIX, msvcrt on Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
 ''' run the script from the directory with "python main.py" '''
 
 LOCK_FILE = 'main.lock'
 CONFIG_FILE = 'config.json'
 SEPARATOR = "-" * 30  # Adjust as needed.
 
+# Descriptor holding the lock on LOCK_FILE while this process runs
+LOCK_FD = None
+
+# psutil handle on this process, created on first sample and reused afterwards
+_PROC = None
+
+# Worker-side (name, SharedMemory, int64 view) of the shared ID block, attached on first use
+_SHARED_IDS = None
+
+# Background thread writing root log records to the console and log files;
+# created by setup_logging(), started by start_logging()
+LOG_LISTENER = None
+LOG_STARTED = False
+
 def setup_logging():
-    """Configure logging to console, main.log, and error.log for errors."""
+    """
+    Configure logging to console, main.log, and error.log for errors.
+    The root logger only gets a QueueHandler on a multiprocessing queue, which
+    pool workers log into as well (see init_worker). A QueueListener thread
+    formats and writes the records, so the chunk loop never blocks on log I/O.
+    The listener is not started here: main() starts it once the worker pool
+    has forked, so no worker is forked while the listener thread holds a lock.
+    Records logged before that simply wait in the queue.
+    """
+    global LOG_LISTENER
+    if LOG_LISTENER is not None:
+        return
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
     formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
@@ -23,86 +67,236 @@ def setup_logging():
     # Main log file handler.
     main_handler = logging.FileHandler('main.log', mode='a')
     main_handler.setFormatter(formatter)
-    logger.addHandler(main_handler)
 
     # Console handler.
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
 
     # Error log file handler.
     error_handler = logging.FileHandler('error.log', mode='a')
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(formatter)
-    logger.addHandler(error_handler)
+
+    q = multiprocessing.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(q))
+    LOG_LISTENER = logging.handlers.QueueListener(
+        q, main_handler, console_handler, error_handler, respect_handler_level=True
+    )
+
+def start_logging():
+    """Start the listener thread writing queued records (once)."""
+    global LOG_STARTED
+    if LOG_LISTENER is None or LOG_STARTED:
+        return
+    LOG_LISTENER.start()
+    LOG_STARTED = True
+
+def init_worker(log_queue):
+    """Pool initializer: send the worker's log records to the parent's listener queue."""
+    logger = logging.getLogger()
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+
+def stop_logging():
+    """Flush queued records, stop the listener thread and close its handlers."""
+    global LOG_LISTENER, LOG_STARTED
+    if LOG_LISTENER is None:
+        return
+    # Exiting before main() started the listener: start it so queued records are written
+    start_logging()
+    logger = logging.getLogger()
+    for h in list(logger.handlers):
+        if isinstance(h, logging.handlers.QueueHandler) and h.queue is LOG_LISTENER.queue:
+            logger.removeHandler(h)
+    LOG_LISTENER.stop()
+    for h in LOG_LISTENER.handlers:
+        h.close()
+    LOG_LISTENER = None
+    LOG_STARTED = False
+
+def log_section(msg, *args, level=logging.INFO):
+    """Log msg % args between two SEPARATOR lines as a single record: one format and one write."""
+    logging.log(level, "%s\n" + msg + "\n%s", SEPARATOR, *args, SEPARATOR)
 
 def acquire_lock():
-    """Acquire a lock by creating a lock file. Exit if it already exists."""
-    if os.path.exists(LOCK_FILE):
-        logging.error("Lock file exists. Another instance might be running. Exiting.")
+    """
+    Take an exclusive, non-blocking lock on the lock file. Exit if another
+    instance holds it. The kernel drops the lock when the process dies, so a
+    leftover file never blocks a new run; the PID is written only for debugging.
+    """
+    global LOCK_FD
+    try:
+        fd = os.open(LOCK_FILE, os.O_CREAT | os.O_RDWR, 0o644)
+    except OSError as e:
+        logging.error("Failed to create lock file: %s", e)
         sys.exit(1)
     try:
-        with open(LOCK_FILE, 'w') as f:
-            f.write(str(os.getpid()))
-        logging.info(f"Acquired lock with file {LOCK_FILE}.")
-    except Exception as e:
-        logging.error(f"Failed to create lock file: {e}")
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        os.close(fd)
+        logging.error("Lock file is held. Another instance is running. Exiting.")
         sys.exit(1)
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    LOCK_FD = fd
+    logging.info("Acquired lock with file %s.", LOCK_FILE)
 
 def release_lock():
-    """Remove the lock file if it exists."""
-    if os.path.exists(LOCK_FILE):
-        os.remove(LOCK_FILE)
-        logging.info(f"Released lock and removed {LOCK_FILE}.")
+    """
+    Release the lock by closing its descriptor. The file is left in place:
+    unlinking it would let a process that already opened the old file and a
+    new one each hold a lock at once.
+    """
+    global LOCK_FD
+    if LOCK_FD is None:
+        return
+    try:
+        os.close(LOCK_FD)
+        logging.info("Released lock on %s.", LOCK_FILE)
+    except OSError as e:
+        logging.error("Failed to release lock: %s", e)
+    LOCK_FD = None
 
+# atexit runs handlers in reverse order, so release_lock (and the pool and
+# shared memory cleanup registered later) still log before the listener stops
+atexit.register(stop_logging)
 atexit.register(release_lock)
 
+# Config schema; with msgspec installed it is validated while decoding, the result is a plain dict
+class Config(TypedDict, total=False):
+    chunk_size: int
+    get_ids: str
+    process_chunk: str
+    track_memory: bool
+    dynamic_batch_size_based_on_memory_usage: bool
+    max_memory_usage: float
+    workers: Optional[int]
+
+@functools.lru_cache(maxsize=8)
+def _parse_config(config_file, mtime_ns, size):
+    """Parse a config file; cached by (path, mtime, size) so an unchanged file is parsed once."""
+    with open(config_file, "rb") as f:
+        data = f.read()
+    if msgspec is not None:
+        return msgspec.json.decode(data, type=Config)
+    return json.loads(data)
+
 def load_config(config_file=CONFIG_FILE):
-    """Load the configuration from a JSON file."""
+    """Load the configuration from a JSON file.
+
+    The returned dict is shared with the parse cache; treat it as read-only."""
     try:
-        with open(config_file, "r") as f:
-            config = json.load(f)
-        logging.info(f"Loaded configuration from {config_file}.")
+        st = os.stat(config_file)
+        config = _parse_config(os.fspath(config_file), st.st_mtime_ns, st.st_size)
+        logging.info("Loaded configuration from %s.", config_file)
         return config
     except Exception as e:
-        logging.error(f"Error reading configuration file {config_file}: {e}")
+        logging.error("Error reading configuration file %s: %s", config_file, e)
         sys.exit(1)
 
-def get_ids(filename: str) -> List[Union[int, str]]:
+load_config.cache_clear = _parse_config.cache_clear
+
+def load_module(filename: str, func: str):
     """
-    Call the get_ids.py file, which simulates an API call by sleeping
-    for 4 seconds and then returning an array of IDs as a JSON string.
+    Import a helper script named in the config (e.g. "get_ids.py") as a module
+    and return its function `func`. Logs which one is missing and exits if the
+    module cannot be imported or does not define the function.
     """
-    logging.info(f"Calling {filename} to retrieve IDs...")
-    result = subprocess.run([sys.executable, filename],
-                            capture_output=True, text=True)
-    if result.returncode != 0:
-        logging.error(f"Error retrieving IDs: {result.stderr}")
-        return []
     try:
-        ids = json.loads(result.stdout)
-    except json.JSONDecodeError as e:
-        logging.error(f"Error parsing IDs JSON: {e}")
+        module = importlib.import_module(Path(filename).stem)
+    except ImportError as e:
+        logging.error("Cannot import %s: %s", filename, e)
+        sys.exit(1)
+    try:
+        return getattr(module, func)
+    except AttributeError:
+        logging.error("%s does not define %s().", filename, func)
+        sys.exit(1)
+
+def get_ids(filename: str) -> Union[List[Union[int, str]], array]:
+    """
+    Import the get_ids.py file and call its get_ids(), which simulates an API
+    call by sleeping for 4 seconds and then returning a list of IDs.
+    """
+    logging.info("Calling %s to retrieve IDs...", filename)
+    fetch_ids = load_module(filename, "get_ids")
+    try:
+        ids = fetch_ids()
+    except Exception as e:
+        logging.error("Error retrieving IDs: %s", e)
         return []
-    logging.info(f"Successfully retrieved {len(ids)} IDs.")
+    logging.info("Successfully retrieved %s IDs.", len(ids))
     return ids
 
+def share_ids(ids) -> Union[shared_memory.SharedMemory, None]:
+    """
+    Copy the IDs into a shared memory block of int64s, once, so workers can read
+    their chunk by (start, stop) instead of receiving a pickled list each time.
+    Returns None if the IDs are not all integers that fit in 64 bits.
+    """
+    if not ids:
+        return None
+    if isinstance(ids, array) and ids.typecode == 'q':
+        # Already packed int64s (get_ids.py returns these); no per-ID check or copy
+        packed = ids
+    elif not all(type(i) is int for i in ids):
+        return None
+    else:
+        try:
+            packed = array('q', ids)
+        except OverflowError:
+            return None
+    shm = shared_memory.SharedMemory(create=True, size=len(packed) * packed.itemsize)
+    shm.buf[:len(packed) * packed.itemsize] = memoryview(packed).cast('B')
+    return shm
+
+def shared_slice(shm_name: str, start: int, stop: int) -> List[int]:
+    """Worker side: IDs [start, stop) of the shared ID block, mapping it on first use."""
+    global _SHARED_IDS
+    if _SHARED_IDS is None or _SHARED_IDS[0] != shm_name:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _SHARED_IDS = (shm_name, shm, shm.buf.cast('q'))
+    return _SHARED_IDS[2][start:stop].tolist()
+
+def run_chunk(task):
+    """
+    Pool task: process one chunk. task is (process_ids, chunk_no, shm_name, ids,
+    start, stop); ids is None when the chunk is read from the shared block.
+    Returns (chunk_no, seconds, result, error) so a failure is reported against
+    its chunk instead of being raised out of imap_unordered.
+    """
+    process_ids, chunk_no, shm_name, ids, start, stop = task
+    started = time.perf_counter()
+    try:
+        chunk = ids if shm_name is None else shared_slice(shm_name, start, stop)
+        result, error = process_ids(chunk), None
+    except Exception as e:
+        result, error = None, repr(e)
+    return chunk_no, time.perf_counter() - started, result, error
+
 def get_memory_usage() -> float:
     """Return the current process memory usage in megabytes."""
-    process = psutil.Process(os.getpid())
-    mem_bytes = process.memory_info().rss
+    global _PROC
+    if _PROC is None:
+        _PROC = psutil.Process()
+    mem_bytes = _PROC.memory_info().rss
     return mem_bytes / (1024 * 1024) # 1024 * 1024 equals 1,048,576, which is the number of bytes in one megabyte
 
+@functools.lru_cache(maxsize=None)
 def get_total_system_memory() -> float:
-    """Return total system memory in megabytes."""
+    """Return total system memory in megabytes; read once, it does not change while running."""
     total_bytes = psutil.virtual_memory().total
     return total_bytes / (1024 * 1024)
 
 def main():
     setup_logging()
     acquire_lock()
-    logging.info(SEPARATOR)
-    logging.info("Starting data migration process.")
+    logging.info("%s\nStarting data migration process.", SEPARATOR)
 
     config = load_config()
     track_memory = config.get("track_memory", True)
@@ -110,48 +304,85 @@ def main():
     default_chunk_size = config.get("chunk_size", 10)
     chunk_size = default_chunk_size
     max_memory_usage_percent = config.get("max_memory_usage", 50)  # e.g. 50%
+    workers = config.get("workers") or os.cpu_count()
 
     if track_memory:
         overall_start_mem = get_memory_usage()
         total_system_mem = get_total_system_memory()
-        logging.info(f"Initial memory usage: {overall_start_mem:.2f} MB")
-        logging.info(f"Total system memory: {total_system_mem:.2f} MB")
+        logging.info("Initial memory usage: %.2f MB\nTotal system memory: %.2f MB",
+                     overall_start_mem, total_system_mem)
+        # Memory budget for one chunk; invariant for the whole run.
+        allowed_delta_mb = (max_memory_usage_percent / 100) * total_system_mem
+
+    # Worker processes are started once and reused for every chunk, so each
+    # chunk costs a pickled list over a pipe instead of a fresh interpreter.
+    # Started before the ID fetch so worker start-up overlaps the API call.
+    process_ids = load_module(config.get("process_chunk"), "process_ids")
+    if os.name == 'posix':
+        # Workers must share this process's resource tracker; one of their own
+        # would report the shared ID block as leaked, and unlink it, when they exit.
+        resource_tracker.ensure_running()
+    # Workers log into the listener's queue; the listener starts only after they forked
+    pool = multiprocessing.Pool(processes=workers, initializer=init_worker,
+                                initargs=(LOG_LISTENER.queue,))
+    atexit.register(pool.join)
+    atexit.register(pool.close)
+    start_logging()
 
     # Retrieve IDs from the external file.
     get_ids_file = config.get("get_ids")
     ids = get_ids(get_ids_file)
     total_ids = len(ids)
-    logging.info(f"Total IDs to process: {total_ids}")
-    logging.info(SEPARATOR)
+    logging.info("Total IDs to process: %s\n%s", total_ids, SEPARATOR)
+
+    # Integer IDs go to the workers through shared memory; other IDs are pickled per chunk.
+    shm = share_ids(ids)
+    if shm is not None:
+        atexit.register(shm.unlink)
+        atexit.register(shm.close)
 
     index = 0
     chunk_counter = 0
+    failed = False
     # List to track the chunk size (batch size) used for each chunk.
     batch_sizes_history = []
-    # Arrays to track memory details if enabled.
+    # Arrays to track memory details (one entry per generation) if enabled.
     memory_usage_deltas = []
     memory_usage_percentages = []
+    # Smoothed memory used per record; damps chunk size swings from one noisy sample.
+    avg_mem_per_record = None
 
-    while index < total_ids:
-        chunk_counter += 1
-        # Append the current chunk size to our history.
-        batch_sizes_history.append(chunk_size)
-        current_chunk = ids[index:index + chunk_size]
-        logging.info(SEPARATOR)
-        logging.info(f"Processing chunk {chunk_counter} with {len(current_chunk)} records.")
-        chunk_start_time = datetime.datetime.now()
+    # Chunks run in generations of up to `workers` at once, overlapping their
+    # API calls. Memory is sampled around each generation and the chunk size is
+    # adjusted before the next one is cut, so dynamic sizing still applies.
+    while index < total_ids and not failed:
+        tasks = []
+        while index < total_ids and len(tasks) < workers:
+            chunk_counter += 1
+            # Append the current chunk size to our history.
+            batch_sizes_history.append(chunk_size)
+            stop = min(index + chunk_size, total_ids)
+            chunk_ids = None if shm is not None else ids[index:stop]
+            tasks.append((process_ids, chunk_counter, shm and shm.name, chunk_ids, index, stop))
+            logging.info("Processing chunk %s with %s records.", chunk_counter, stop - index)
+            index = stop
+        generation_records = sum(stop - start for *_, start, stop in tasks)
 
         mem_before = get_memory_usage() if track_memory else None
         if track_memory:
-            logging.info(f"Memory before processing chunk: {mem_before:.2f} MB")
+            logging.info("Memory before processing chunks: %.2f MB", mem_before)
 
-        # Convert chunk to JSON and process.
-        chunk_arg = json.dumps(current_chunk)
-        process_chunk_file = config.get("process_chunk")
-        result = subprocess.run([sys.executable, process_chunk_file, chunk_arg],
-                                capture_output=True, text=True)
-        chunk_end_time = datetime.datetime.now()
-        duration = (chunk_end_time - chunk_start_time).total_seconds()
+        # Results arrive in completion order; the whole generation is drained
+        # even after a failure so every in-flight chunk is reported.
+        for chunk_no, duration, result, error in pool.imap_unordered(run_chunk, tasks):
+            if error is not None:
+                logging.error("%s\nError processing chunk %s after %.2f seconds: %s",
+                              SEPARATOR, chunk_no, duration, error)
+                failed = True
+            else:
+                logging.info("%s\nChunk %s processed successfully in %.2f seconds.\nOutput: %s",
+                             SEPARATOR, chunk_no, duration, result)
+        logging.info(SEPARATOR)
 
         if track_memory:
             mem_after = get_memory_usage()
@@ -159,44 +390,39 @@ def main():
             memory_usage_deltas.append(delta)
             percentage = (delta / total_system_mem) * 100
             memory_usage_percentages.append(percentage)
-            logging.info(f"Memory after processing chunk: {mem_after:.2f} MB")
-            logging.info(f"Chunk {chunk_counter} processed in {duration:.2f} seconds with a memory delta of {delta:.2f} MB ({percentage:.4f}% of total system memory).")
-        else:
-            logging.info(f"Chunk {chunk_counter} processed in {duration:.2f} seconds.")
-
-        if result.returncode != 0:
-            logging.error(f"Error processing chunk {chunk_counter}: {result.stderr}")
-            break
-        else:
-            logging.info(f"Chunk {chunk_counter} processed successfully.")
-            logging.info(f"Output: {result.stdout.strip()}")
-        logging.info(SEPARATOR)
-
-        # Update index.
-        index += len(current_chunk)
+            logging.info("Memory after processing chunks: %.2f MB\n"
+                         "Chunks %s-%s used a memory delta of %.2f MB (%.4f%% of total system memory).",
+                         mem_after, tasks[0][1], tasks[-1][1], delta, percentage)
 
         # If dynamic batch sizing is enabled and memory is tracked, adjust chunk_size.
-        if track_memory and dynamic_batch and len(current_chunk) > 0:
-            avg_mem_per_record = delta / len(current_chunk) if delta > 0 else 0
+        if track_memory and dynamic_batch and generation_records > 0:
+            sample = max(delta, 0) / generation_records
+            if avg_mem_per_record is None:
+                avg_mem_per_record = sample
+            else:
+                avg_mem_per_record = 0.9 * avg_mem_per_record + 0.1 * sample
             if avg_mem_per_record > 0:
-                allowed_delta_mb = (max_memory_usage_percent / 100) * total_system_mem
                 new_chunk_size = int(allowed_delta_mb / avg_mem_per_record)
                 new_chunk_size = max(1, new_chunk_size)
-                logging.info(f"Adjusting chunk size from {chunk_size} to {new_chunk_size} based on average memory usage per record ({avg_mem_per_record:.4f} MB).")
+                logging.info("Adjusting chunk size from %s to %s based on average memory usage per record (%.4f MB).",
+                             chunk_size, new_chunk_size, avg_mem_per_record)
                 chunk_size = new_chunk_size
             else:
                 chunk_size = default_chunk_size
 
     if track_memory:
         overall_end_mem = get_memory_usage()
-        logging.info(f"Final memory usage: {overall_end_mem:.2f} MB")
-        logging.info(f"Memory usage delta per chunk (MB): {memory_usage_deltas}")
-        logging.info(f"Memory usage percentage per chunk (%): {memory_usage_percentages}")
-
-    logging.info(SEPARATOR)
-    logging.info(f"Batch sizes used per chunk: {batch_sizes_history}")
-    logging.info("Data migration process completed.")
-    logging.info(SEPARATOR)
+        logging.info("Final memory usage: %.2f MB\n"
+                     "Memory usage delta per generation (MB): %s\n"
+                     "Memory usage percentage per generation (%%): %s",
+                     overall_end_mem, memory_usage_deltas, memory_usage_percentages)
+
+    if failed:
+        log_section("Batch sizes used per chunk: %s\nData migration process aborted after a chunk failed.",
+                    batch_sizes_history, level=logging.ERROR)
+    else:
+        log_section("Batch sizes used per chunk: %s\nData migration process completed.",
+                    batch_sizes_history)
 
 if __name__ == "__main__":
     main()
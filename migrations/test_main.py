@@ -0,0 +1,170 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import textwrap
+import subprocess
+from array import array
+from pathlib import Path
+from unittest.mock import patch
+
+# Import the migration module
+import migrations.main as mg_main
+
+"""
+Run it like: python3 -m unittest discover -v
+"""
+
+def failing_process_ids(ids):
+    raise ValueError(f"bad ids {ids}")
+
+class TestMigrationsMain(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmpdir = Path(tmp.name)
+        patcher = patch.object(mg_main, 'LOCK_FILE', str(self.tmpdir / 'main.lock'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Each test maps the shared ID block afresh
+        patcher = patch.object(mg_main, '_SHARED_IDS', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def share(self, ids):
+        shm = mg_main.share_ids(ids)
+        self.assertIsNotNone(shm)
+
+        def cleanup():
+            # Drop this process's attached view before the block goes away
+            if mg_main._SHARED_IDS is not None:
+                _, attached, view = mg_main._SHARED_IDS
+                view.release()
+                attached.close()
+                mg_main._SHARED_IDS = None
+            shm.close()
+            shm.unlink()
+        self.addCleanup(cleanup)
+        return shm
+
+    def test_shared_slice_round_trip(self):
+        shm = self.share(array('q', range(1, 11)))
+        self.assertEqual(mg_main.shared_slice(shm.name, 2, 5), [3, 4, 5])
+        self.assertEqual(mg_main.shared_slice(shm.name, 8, 10), [9, 10])
+
+    def test_share_ids_packs_plain_lists(self):
+        shm = self.share([5, -1, 2 ** 40])
+        self.assertEqual(mg_main.shared_slice(shm.name, 0, 3), [5, -1, 2 ** 40])
+
+    def test_share_ids_rejects_non_integer_ids(self):
+        self.assertIsNone(mg_main.share_ids([]))
+        self.assertIsNone(mg_main.share_ids([1, "2"]))
+        self.assertIsNone(mg_main.share_ids([1, 2 ** 70]))
+
+    def test_run_chunk_success(self):
+        chunk_no, seconds, result, error = mg_main.run_chunk((sorted, 1, None, [3, 1, 2], 0, 3))
+        self.assertEqual((chunk_no, result, error), (1, [1, 2, 3], None))
+        self.assertGreaterEqual(seconds, 0)
+        # Chunks read from the shared block come back as plain lists
+        shm = self.share(array('q', range(10)))
+        self.assertEqual(mg_main.run_chunk((list, 2, shm.name, None, 4, 7))[2], [4, 5, 6])
+
+    def test_run_chunk_failure(self):
+        chunk_no, _, result, error = mg_main.run_chunk((failing_process_ids, 7, None, [1], 0, 1))
+        self.assertEqual(chunk_no, 7)
+        self.assertIsNone(result)
+        self.assertIn("ValueError('bad ids [1]')", error)
+
+    @unittest.skipIf(mg_main.fcntl is None, "flock not available")
+    def test_acquire_lock_contention(self):
+        # Another open file description holding the flock blocks acquisition
+        with open(mg_main.LOCK_FILE, 'w') as holder:
+            mg_main.fcntl.flock(holder.fileno(), mg_main.fcntl.LOCK_EX | mg_main.fcntl.LOCK_NB)
+            with self.assertRaises(SystemExit), self.assertLogs(level='ERROR'):
+                mg_main.acquire_lock()
+            self.assertIsNone(mg_main.LOCK_FD)
+        # Once the holder is gone the lock is free; the file itself stays behind
+        mg_main.acquire_lock()
+        try:
+            self.assertEqual(Path(mg_main.LOCK_FILE).read_text(), str(os.getpid()))
+        finally:
+            mg_main.release_lock()
+        self.assertIsNone(mg_main.LOCK_FD)
+        self.assertTrue(Path(mg_main.LOCK_FILE).exists())
+
+    def run_migration(self, config, process_ids_src, memory_samples=None):
+        # main() works from its current directory; run it in a scratch one, in a
+        # child process so its pool, lock and atexit hooks stay out of this one
+        (self.tmpdir / 'config.json').write_text(json.dumps(config))
+        (self.tmpdir / 'ids_src.py').write_text("def get_ids():\n    return list(range(1, 21))\n")
+        (self.tmpdir / 'chunk_src.py').write_text(textwrap.dedent(process_ids_src))
+        script = textwrap.dedent(f"""
+            import sys
+            sys.path.insert(0, {str(Path(__file__).parent.parent)!r})
+            import migrations.main as m
+            if {memory_samples is not None}:
+                samples = iter({memory_samples!r})
+                m.get_memory_usage = lambda: next(samples)
+                m.get_total_system_memory = lambda: 1000.0
+            m.main()
+        """)
+        proc = subprocess.run([sys.executable, '-c', script], cwd=self.tmpdir,
+                              capture_output=True, text=True, timeout=60)
+        return proc, (self.tmpdir / 'main.log').read_text()
+
+    def test_main_generations_and_ema_chunk_sizing(self):
+        config = {"chunk_size": 5, "get_ids": "ids_src.py", "process_chunk": "chunk_src.py",
+                  "track_memory": True, "dynamic_batch_size_based_on_memory_usage": True,
+                  "max_memory_usage": 0.5, "workers": 2}
+        src = """
+            import logging
+            def process_ids(ids):
+                logging.warning("WORKER-LOG %s", ids[0])
+                return len(ids)
+        """
+        # start, then (before, after) per generation, then final: +1 MB per generation
+        proc, log = self.run_migration(config, src, [0.0, 1.0, 2.0, 2.0, 3.0, 3.0])
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        # Generation 1: two chunks of 5 use 1 MB → 0.1 MB/record; 5 MB budget → chunk size 50
+        self.assertIn("Batch sizes used per chunk: [5, 5, 50]", log)
+        self.assertIn("Adjusting chunk size from 5 to 50", log)
+        # Generation 2 sample is 0.1 MB/record as well, so the EMA stays put
+        self.assertIn("Adjusting chunk size from 50 to 50", log)
+        self.assertIn("Data migration process completed.", log)
+        # Worker log records reach the parent's log files
+        self.assertEqual(sorted(l.split("WORKER-LOG ")[1] for l in log.splitlines() if "WORKER-LOG" in l),
+                         ["1", "11", "6"])
+
+    def test_main_stops_after_failed_generation(self):
+        config = {"chunk_size": 5, "get_ids": "ids_src.py", "process_chunk": "chunk_src.py",
+                  "track_memory": False, "workers": 2}
+        src = """
+            def process_ids(ids):
+                if 8 in ids:
+                    raise ValueError("bad id")
+                return len(ids)
+        """
+        proc, log = self.run_migration(config, src)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        # The whole first generation is reported, the second one never starts
+        self.assertIn("Error processing chunk 2", log)
+        self.assertIn("Chunk 1 processed successfully", log)
+        self.assertIn("Batch sizes used per chunk: [5, 5]", log)
+        self.assertIn("aborted after a chunk failed", log)
+
+    def test_main_exits_on_missing_helper(self):
+        config = {"chunk_size": 5, "get_ids": "ids_src.py", "process_chunk": "chunk_src.py",
+                  "track_memory": False, "workers": 1}
+        proc, log = self.run_migration(config, "def other(ids):\n    return 0\n")
+        self.assertEqual(proc.returncode, 1)
+        self.assertNotIn("Traceback", proc.stderr)
+        self.assertIn("chunk_src.py does not define process_ids().", log)
+        config["get_ids"] = "no_such_ids.py"
+        proc, log = self.run_migration(config, "def process_ids(ids):\n    return 0\n")
+        self.assertEqual(proc.returncode, 1)
+        self.assertNotIn("Traceback", proc.stderr)
+        self.assertIn("Cannot import no_such_ids.py: No module named 'no_such_ids'", log)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
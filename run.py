@@ -10,24 +10,48 @@ OR
 python run.py
 """
 
-import json
-import subprocess
+import marshal
+import os
 import sys
-from pathlib import Path
 
 # 1. Locate the run configuration
-config_path = Path(__file__).parent / "run.json"
-if not config_path.exists():
+base_dir = os.path.dirname(os.path.abspath(__file__))
+config_path = os.path.join(base_dir, "run.json")
+# Parsed run.json, stored with the (mtime, size) it was read at; marshal is built in,
+# so a cache hit skips importing json (and the re module it pulls in) altogether
+cache_path = os.path.join(base_dir, "__pycache__", "run.json.marshal")
+try:
+    st = os.stat(config_path)
+except OSError:
     print(f"Error: run.json not found at {config_path}", file=sys.stderr)
     sys.exit(1)
 
 # 2. Load configuration
+cfg = None
 try:
-    with config_path.open(encoding='utf-8') as f:
-        cfg = json.load(f)
-except json.JSONDecodeError as e:
-    print(f"Error parsing run.json: {e}", file=sys.stderr)
-    sys.exit(1)
+    with open(cache_path, 'rb') as f:
+        mtime_ns, size, cached = marshal.load(f)
+    if (mtime_ns, size) == (st.st_mtime_ns, st.st_size):
+        cfg = cached
+except (OSError, EOFError, ValueError, TypeError):
+    pass  # no usable cache; parse run.json below
+
+if cfg is None:
+    import json
+    try:
+        with open(config_path, encoding='utf-8') as f:
+            cfg = json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"Error parsing run.json: {e}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            marshal.dump((st.st_mtime_ns, st.st_size, cfg), f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # read-only checkout: just parse every time
 
 # 3. Determine entry point
 entry = cfg.get("entry_point")
@@ -35,12 +59,19 @@ if not entry:
     print("Error: 'entry_point' not specified in run.json", file=sys.stderr)
     sys.exit(1)
 
-entry_path = Path(__file__).parent / entry
-if not entry_path.exists():
+entry_path = os.path.join(base_dir, entry)
+if not os.path.exists(entry_path):
     print(f"Error: entry_point '{entry}' not found at {entry_path}", file=sys.stderr)
     sys.exit(1)
 
 # 4. Invoke the selected main script
 #    Pass through any CLI arguments
-result = subprocess.run([sys.executable, str(entry_path)] + sys.argv[1:])
+argv = [sys.executable, entry_path] + sys.argv[1:]
+if os.name != 'nt':
+    # Replace this launcher with the entry point: same PID, exit code and signals, no extra process
+    os.execv(sys.executable, argv)
+
+#    Windows has no real exec (the launcher would exit before the child finishes), so wait on it
+import subprocess
+result = subprocess.run(argv)
 sys.exit(result.returncode)
\ No newline at end of file